@@ -606,4 +606,18 @@ async def create_trading_agent(agent_id: str = None, openai_api_key: str = None)
     if openai_api_key:
         await agent.initialize(openai_api_key)
     
-    return agent
\ No newline at end of file
+    return agent
+
+# Shared agent, built once per API key (LangChain tools + OpenAI client are costly)
+_shared_agent: Optional[TradingAgent] = None
+_shared_agent_key: Optional[str] = None
+_agent_lock = asyncio.Lock()
+
+async def get_trading_agent(openai_api_key: str) -> TradingAgent:
+    """Get the shared trading agent, creating it on first use"""
+    global _shared_agent, _shared_agent_key
+    async with _agent_lock:
+        if _shared_agent is None or _shared_agent_key != openai_api_key:
+            _shared_agent = await create_trading_agent(openai_api_key=openai_api_key)
+            _shared_agent_key = openai_api_key
+    return _shared_agent
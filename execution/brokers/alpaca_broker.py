@@ -4,14 +4,24 @@ Handles paper trading and live trading through Alpaca API
 """
 
 import os
+import time
 import asyncio
-from typing import Dict, List, Optional, Any, Union
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Union, Tuple, Callable
 from datetime import datetime, timedelta
 from decimal import Decimal
+import json
 import logging
 
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import alpaca_trade_api as tradeapi
 from alpaca_trade_api.rest import APIError
+from alpaca_trade_api.stream import Stream
 from alpaca_trade_api.entity import Order, Position, Account, Asset
 
 from ..base_broker import BaseBroker
@@ -19,6 +29,205 @@ from ...utils.database import get_mongodb_client
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+_NOT_CONNECTED_MSG = "Not connected to Alpaca. Call connect() first."
+
+# Max age of the cached account entity, in seconds
+_ACCOUNT_CACHE_TTL = 2.0
+
+# Trade update events that change positions, and the cache resync period
+_FILL_EVENTS = frozenset({'fill', 'partial_fill'})
+_TERMINAL_ORDER_STATUSES = frozenset({
+    'filled', 'canceled', 'expired', 'rejected', 'replaced', 'done_for_day'
+})
+_POSITION_RECONCILE_INTERVAL = 60.0
+_QTY_EPSILON = 1e-9
+
+# Trade persistence batching
+_PERSIST_BATCH_SIZE = 100
+_PERSIST_BATCH_WINDOW = 0.05  # seconds
+_PERSIST_SENTINEL = object()
+
+# Column order of the array returned by get_market_data_np()
+_OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'vwap')
+
+# Timeframe -> Alpaca bar timeframe
+_TIMEFRAME_MAP = MappingProxyType({
+    '1m': '1Min',
+    '5m': '5Min',
+    '15m': '15Min',
+    '30m': '30Min',
+    '1h': '1Hour',
+    '1d': '1Day',
+    '1w': '1Week',
+    '1M': '1Month'
+})
+
+
+@lru_cache(maxsize=256)
+def _iso_cached(dt: datetime, tz: Any) -> str:
+    return dt.isoformat()
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    """ISO-format a timestamp, reusing strings for recently seen values"""
+    if not dt:
+        return None
+    # tzinfo is part of the key: equal instants in different zones format differently
+    return _iso_cached(dt, dt.tzinfo)
+
+
+@dataclass(slots=True)
+class AlpacaOrderDTO:
+    """Serialized view of an Alpaca order entity"""
+    id: str
+    client_order_id: Optional[str] = None
+    symbol: Optional[str] = None
+    asset_id: Optional[str] = None
+    asset_class: Optional[str] = None
+    qty: Optional[float] = None
+    filled_qty: Optional[float] = None
+    side: Optional[str] = None
+    order_type: Optional[str] = None
+    time_in_force: Optional[str] = None
+    limit_price: Optional[float] = None
+    stop_price: Optional[float] = None
+    trail_price: Optional[float] = None
+    trail_percent: Optional[float] = None
+    status: Optional[str] = None
+    extended_hours: Optional[bool] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    submitted_at: Optional[str] = None
+    filled_at: Optional[str] = None
+    expired_at: Optional[str] = None
+    canceled_at: Optional[str] = None
+    failed_at: Optional[str] = None
+    replaced_at: Optional[str] = None
+    filled_avg_price: Optional[float] = None
+    hwm: Optional[float] = None
+    legs: Optional[Any] = None
+    
+    @classmethod
+    def from_entity(cls, order: Any) -> 'AlpacaOrderDTO':
+        """Build DTO from an Alpaca order entity, casting fields once"""
+        values = {}
+        for name in _ORDER_FIELDS:
+            value = getattr(order, name, None)
+            if name in _ORDER_QTY_FIELDS:
+                value = float(value) if value is not None else None
+            elif name in _ORDER_FLOAT_FIELDS:
+                value = float(value) if value else None
+            elif name in _ORDER_DATETIME_FIELDS:
+                value = _iso(value)
+            values[name] = value
+        return cls(**values)
+    
+    def to_dict(self, keys: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        """Serialize to dict, optionally restricted to a subset of keys"""
+        return {name: getattr(self, name) for name in (keys or _ORDER_FIELDS)}
+
+
+_ORDER_FIELDS: Tuple[str, ...] = tuple(f.name for f in fields(AlpacaOrderDTO))
+_ORDER_QTY_FIELDS = frozenset({'qty', 'filled_qty'})
+_ORDER_FLOAT_FIELDS = frozenset({
+    'limit_price', 'stop_price', 'trail_price',
+    'trail_percent', 'filled_avg_price', 'hwm'
+})
+_ORDER_DATETIME_FIELDS = frozenset({
+    'created_at', 'updated_at', 'submitted_at', 'filled_at',
+    'expired_at', 'canceled_at', 'failed_at', 'replaced_at'
+})
+
+# Key subset returned by get_order()
+_ORDER_DETAIL_KEYS = (
+    'id', 'client_order_id', 'symbol', 'qty', 'filled_qty', 'side',
+    'order_type', 'status', 'created_at', 'filled_avg_price'
+)
+
+def _position_to_dict(pos: Any) -> Dict[str, Any]:
+    """Serialize an Alpaca position entity"""
+    qty = float(pos.qty)
+    return {
+        'symbol': pos.symbol,
+        'qty': qty,
+        'side': 'long' if qty > 0 else 'short',
+        'market_value': float(pos.market_value),
+        'cost_basis': float(pos.cost_basis),
+        'unrealized_pl': float(pos.unrealized_pl),
+        'unrealized_plpc': float(pos.unrealized_plpc),
+        'avg_entry_price': float(pos.avg_entry_price),
+        'current_price': float(pos.current_price) if pos.current_price else None,
+        'lastday_price': float(pos.lastday_price) if pos.lastday_price else None,
+        'change_today': float(pos.change_today) if pos.change_today else None
+    }
+
+def _order_summary_from_raw(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the get_orders() row directly from raw order JSON"""
+    qty = raw.get('qty')
+    filled_avg_price = raw.get('filled_avg_price')
+    return {
+        'id': raw['id'],
+        'symbol': raw.get('symbol'),
+        'qty': float(qty) if qty is not None else None,
+        'filled_qty': float(raw.get('filled_qty') or 0),
+        'side': raw.get('side'),
+        'order_type': raw.get('order_type'),
+        'status': raw.get('status'),
+        'created_at': raw.get('created_at'),
+        'filled_avg_price': float(filled_avg_price) if filled_avg_price else None
+    }
+
+# Order parameter builders, one per order type
+def _build_market(params: Dict[str, Any], **_) -> None:
+    pass
+
+def _build_limit(params: Dict[str, Any], limit_price=None, **_) -> None:
+    if not limit_price:
+        raise ValueError("Limit orders require limit_price")
+    params['limit_price'] = limit_price
+
+def _build_stop(params: Dict[str, Any], stop_price=None, **_) -> None:
+    if not stop_price:
+        raise ValueError("Stop orders require stop_price")
+    params['stop_price'] = stop_price
+
+def _build_stop_limit(params: Dict[str, Any], limit_price=None, stop_price=None, **_) -> None:
+    if not limit_price or not stop_price:
+        raise ValueError("Stop limit orders require limit_price and stop_price")
+    params['limit_price'] = limit_price
+    params['stop_price'] = stop_price
+
+def _build_trailing_stop(params: Dict[str, Any], trail_price=None, trail_percent=None, **_) -> None:
+    if trail_price:
+        params['trail_price'] = trail_price
+    elif trail_percent:
+        params['trail_percent'] = trail_percent
+    else:
+        raise ValueError("Trailing stop orders require trail_price or trail_percent")
+
+_ORDER_BUILDERS = MappingProxyType({
+    'market': _build_market,
+    'limit': _build_limit,
+    'stop': _build_stop,
+    'stop_limit': _build_stop_limit,
+    'trailing_stop': _build_trailing_stop
+})
+_VALID_SIDES = frozenset({'buy', 'sell'})
+
+def serialize_portfolio_history(history: Dict[str, Any]) -> bytes:
+    """Serialize get_portfolio_history() output to JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(history, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps({
+        key: value.tolist() if isinstance(value, np.ndarray) else value
+        for key, value in history.items()
+    }).encode()
+
 class AlpacaBroker(BaseBroker):
     """Alpaca broker implementation for paper and live trading"""
     
@@ -40,17 +249,60 @@ class AlpacaBroker(BaseBroker):
             base_url=self.base_url,
             api_version='v2'
         )
+        self._configure_http_pool(self.api._session)
+        
+        # Trade updates stream (started on first on_trade_update())
+        self._stream = Stream(
+            self.api_key,
+            self.secret_key,
+            base_url=self.base_url,
+            data_feed='iex'
+        )
+        self._stream_task: Optional[asyncio.Task] = None
+        self._trade_update_handlers: List[Callable] = []
+        self._order_cache: Dict[str, Dict[str, Any]] = {}
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        # Fill sequence number, and the last one applied per symbol, so the
+        # reconcile loop can tell which symbols changed during its fetch
+        self._fill_seq = 0
+        self._last_fill_seq: Dict[str, int] = {}
+        self._reconcile_task: Optional[asyncio.Task] = None
         
         self.connected = False
         self.account_info = None
+        self._account_cache_ts = 0.0
+        
+        # Results of the last warm_up() call
+        self._warm_up_cache: Optional[Dict[str, Any]] = None
+        self._warm_up_ts = 0.0
         
+        # Background trade persistence (started in connect())
+        self._trade_queue: asyncio.Queue = asyncio.Queue()
+        self._persist_task: Optional[asyncio.Task] = None
+        
+    @staticmethod
+    def _configure_http_pool(session: requests.Session):
+        """Reuse keep-alive connections across REST calls"""
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.2)
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+    
     async def connect(self) -> bool:
         """Connect to Alpaca API"""
         try:
             # Test connection by getting account info
             self.account_info = self.api.get_account()
+            self._account_cache_ts = time.monotonic()
             self.connected = True
             
+            if self._persist_task is None or self._persist_task.done():
+                self._persist_task = asyncio.create_task(self._persist_loop())
+            
             logger.info(f"Connected to Alpaca - Account: {self.account_info.id}")
             logger.info(f"Account Status: {self.account_info.status}")
             logger.info(f"Buying Power: ${self.account_info.buying_power}")
@@ -66,19 +318,207 @@ class AlpacaBroker(BaseBroker):
     async def disconnect(self):
         """Disconnect from Alpaca API"""
         self.connected = False
+        
+        if self._stream_task is not None:
+            await self._stream.stop_ws()
+            self._stream_task.cancel()
+            self._stream_task = None
+            self._order_cache.clear()
+        
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            self._reconcile_task = None
+        
+        # Flush pending trades before stopping the persistence worker
+        if self._persist_task is not None:
+            self._trade_queue.put_nowait(_PERSIST_SENTINEL)
+            await self._persist_task
+            self._persist_task = None
+        
         logger.info("Disconnected from Alpaca")
     
-    def _validate_connection(self):
-        """Validate connection before operations"""
+    async def warm_up(self, max_age: float = 5.0) -> Dict[str, Any]:
+        """Fetch account, clock and positions concurrently (cached for max_age seconds)"""
         if not self.connected:
-            raise ConnectionError("Not connected to Alpaca. Call connect() first.")
+            raise ConnectionError(_NOT_CONNECTED_MSG)
+        
+        if self._warm_up_cache is not None and time.monotonic() - self._warm_up_ts < max_age:
+            return self._warm_up_cache
+        
+        account, clock, positions = await asyncio.gather(
+            self.get_account_info(),
+            self.get_clock(),
+            self.get_positions()
+        )
+        self._warm_up_cache = {
+            'account': account,
+            'clock': clock,
+            'positions': positions
+        }
+        self._warm_up_ts = time.monotonic()
+        return self._warm_up_cache
+    
+    async def on_trade_update(self, handler: Optional[Callable] = None):
+        """Subscribe to order/fill updates pushed over the trade_updates stream"""
+        if handler is not None:
+            self._trade_update_handlers.append(handler)
+        
+        if not self._stream_alive():
+            # Seed (or, after the stream died, reseed) the position cache;
+            # fills keep it current from here on
+            positions = await asyncio.to_thread(self.api.list_positions)
+            self._positions = {pos.symbol: _position_to_dict(pos) for pos in positions}
+            
+            # Updates missed while the stream was down would leave stale
+            # statuses behind
+            self._order_cache.clear()
+            
+            self._stream.subscribe_trade_updates(self._handle_trade_update)
+            self._stream_task = asyncio.create_task(self._stream._run_forever())
+            if self._reconcile_task is None or self._reconcile_task.done():
+                self._reconcile_task = asyncio.create_task(self._reconcile_positions_loop())
+            logger.info("Subscribed to Alpaca trade updates")
+    
+    def _stream_alive(self) -> bool:
+        """True while the trade updates stream task is running"""
+        return self._stream_task is not None and not self._stream_task.done()
+    
+    async def _handle_trade_update(self, data):
+        """Update the local order cache and fan out to subscribers"""
+        order = Order(data.order)
+        self._order_cache[order.id] = AlpacaOrderDTO.from_entity(order).to_dict(_ORDER_DETAIL_KEYS)
+        
+        if data.event in _FILL_EVENTS:
+            self._apply_fill(order.symbol, order.side, float(data.qty), float(data.price))
+        
+        for handler in self._trade_update_handlers:
+            try:
+                await handler(data)
+            except Exception as e:
+                logger.error(f"Error in trade update handler: {e}")
     
-    async def get_account_info(self) -> Dict[str, Any]:
-        """Get account information"""
-        self._validate_connection()
+    def _apply_fill(self, symbol: str, side: str, fill_qty: float, price: float):
+        """Apply a fill to the cached position for symbol"""
+        self._fill_seq += 1
+        self._last_fill_seq[symbol] = self._fill_seq
+        
+        signed_qty = fill_qty if side == 'buy' else -fill_qty
+        position = self._positions.get(symbol)
+        old_qty = position['qty'] if position else 0.0
+        old_avg = position['avg_entry_price'] if position else 0.0
+        new_qty = old_qty + signed_qty
+        
+        # Fractional fills leave float dust; treat it as flat
+        if abs(new_qty) < _QTY_EPSILON:
+            self._positions.pop(symbol, None)
+            return
+        
+        if old_qty == 0 or (old_qty > 0) != (new_qty > 0):
+            # Opened or flipped: the remainder was entered at the fill price
+            avg_price = price
+        elif abs(new_qty) > abs(old_qty):
+            avg_price = (old_qty * old_avg + signed_qty * price) / new_qty
+        else:
+            # Reduced: entry price is unchanged
+            avg_price = old_avg
+        
+        if position is None:
+            position = {
+                'symbol': symbol,
+                'lastday_price': None,
+                'change_today': None
+            }
+            self._positions[symbol] = position
+        
+        cost_basis = new_qty * avg_price
+        unrealized_pl = (price - avg_price) * new_qty
+        position.update({
+            'qty': new_qty,
+            'side': 'long' if new_qty > 0 else 'short',
+            'market_value': new_qty * price,
+            'cost_basis': cost_basis,
+            'unrealized_pl': unrealized_pl,
+            'unrealized_plpc': unrealized_pl / abs(cost_basis) if cost_basis else 0.0,
+            'avg_entry_price': avg_price,
+            'current_price': price
+        })
+    
+    async def _reconcile_positions_loop(self):
+        """Periodically resync the position cache with Alpaca and report drift"""
+        while True:
+            await asyncio.sleep(_POSITION_RECONCILE_INTERVAL)
+            seq_before = self._fill_seq
+            try:
+                positions = await asyncio.to_thread(self.api.list_positions)
+            except Exception as e:
+                # Keep reconciling: connection/retry errors are transient
+                logger.error(f"Error reconciling positions: {e}")
+                continue
+            
+            remote = {pos.symbol: _position_to_dict(pos) for pos in positions}
+            
+            # Symbols filled while the fetch was in flight keep the cached
+            # state; the snapshot may predate those fills
+            if self._fill_seq != seq_before:
+                for symbol, seq in self._last_fill_seq.items():
+                    if seq > seq_before:
+                        if symbol in self._positions:
+                            remote[symbol] = self._positions[symbol]
+                        else:
+                            remote.pop(symbol, None)
+            
+            for symbol in remote.keys() | self._positions.keys():
+                local_qty = self._positions.get(symbol, {}).get('qty', 0.0)
+                remote_qty = remote.get(symbol, {}).get('qty', 0.0)
+                if local_qty != remote_qty:
+                    logger.warning(f"Position drift for {symbol}: cached {local_qty}, Alpaca {remote_qty}")
+            
+            self._positions = remote
+            self._last_fill_seq.clear()
+    
+    async def _persist_loop(self):
+        """Drain the trade queue and write trades to MongoDB in batches"""
+        stopping = False
+        
+        while not stopping:
+            item = await self._trade_queue.get()
+            if item is _PERSIST_SENTINEL:
+                break
+            
+            # Let the batch window fill up, then drain without awaiting get():
+            # wait_for() on get() can drop an item dequeued as it times out
+            if self._trade_queue.qsize() + 1 < _PERSIST_BATCH_SIZE:
+                await asyncio.sleep(_PERSIST_BATCH_WINDOW)
+            
+            batch = [item]
+            while len(batch) < _PERSIST_BATCH_SIZE:
+                try:
+                    item = self._trade_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _PERSIST_SENTINEL:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            try:
+                db_client = await get_mongodb_client()
+                await db_client.save_trades_bulk(batch)
+            except Exception as e:
+                logger.error(f"Error saving {len(batch)} trades: {e}")
+    
+    async def get_account_info(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """Get account information (reuses the last fetch within _ACCOUNT_CACHE_TTL)"""
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
-            account = self.api.get_account()
+            if (force_refresh or self.account_info is None
+                    or time.monotonic() - self._account_cache_ts >= _ACCOUNT_CACHE_TTL):
+                self.account_info = await asyncio.to_thread(self.api.get_account)
+                self._account_cache_ts = time.monotonic()
+            
+            account = self.account_info
             return {
                 'account_id': account.id,
                 'status': account.status,
@@ -96,7 +536,7 @@ class AlpacaBroker(BaseBroker):
                 'trading_blocked': account.trading_blocked,
                 'transfers_blocked': account.transfers_blocked,
                 'account_blocked': account.account_blocked,
-                'created_at': account.created_at.isoformat() if account.created_at else None,
+                'created_at': _iso(account.created_at),
                 'trade_suspended_by_user': account.trade_suspended_by_user,
                 'shorting_enabled': account.shorting_enabled,
                 'long_market_value': float(account.long_market_value),
@@ -111,27 +551,17 @@ class AlpacaBroker(BaseBroker):
     
     async def get_positions(self) -> List[Dict[str, Any]]:
         """Get current positions"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
+        
+        # Served locally only while the trade updates stream is running; once
+        # it exits, fills may have been missed, so fall back to REST
+        if self._stream_alive():
+            return [dict(pos) for pos in self._positions.values()]
         
         try:
-            positions = self.api.list_positions()
-            position_list = []
-            
-            for pos in positions:
-                position_data = {
-                    'symbol': pos.symbol,
-                    'qty': float(pos.qty),
-                    'side': 'long' if float(pos.qty) > 0 else 'short',
-                    'market_value': float(pos.market_value),
-                    'cost_basis': float(pos.cost_basis),
-                    'unrealized_pl': float(pos.unrealized_pl),
-                    'unrealized_plpc': float(pos.unrealized_plpc),
-                    'avg_entry_price': float(pos.avg_entry_price),
-                    'current_price': float(pos.current_price) if pos.current_price else None,
-                    'lastday_price': float(pos.lastday_price) if pos.lastday_price else None,
-                    'change_today': float(pos.change_today) if pos.change_today else None
-                }
-                position_list.append(position_data)
+            positions = await asyncio.to_thread(self.api.list_positions)
+            position_list = [_position_to_dict(pos) for pos in positions]
             
             return position_list
             
@@ -152,14 +582,16 @@ class AlpacaBroker(BaseBroker):
                          extended_hours: bool = False,
                          client_order_id: Optional[str] = None) -> Dict[str, Any]:
         """Place an order"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             # Validate parameters
-            if side not in ['buy', 'sell']:
+            if side not in _VALID_SIDES:
                 raise ValueError("Side must be 'buy' or 'sell'")
             
-            if order_type not in ['market', 'limit', 'stop', 'stop_limit', 'trailing_stop']:
+            builder = _ORDER_BUILDERS.get(order_type)
+            if builder is None:
                 raise ValueError("Invalid order type")
             
             # Build order parameters
@@ -173,20 +605,13 @@ class AlpacaBroker(BaseBroker):
             }
             
             # Add price parameters based on order type
-            if order_type == 'limit' and limit_price:
-                order_params['limit_price'] = limit_price
-            elif order_type == 'stop' and stop_price:
-                order_params['stop_price'] = stop_price
-            elif order_type == 'stop_limit' and limit_price and stop_price:
-                order_params['limit_price'] = limit_price
-                order_params['stop_price'] = stop_price
-            elif order_type == 'trailing_stop':
-                if trail_price:
-                    order_params['trail_price'] = trail_price
-                elif trail_percent:
-                    order_params['trail_percent'] = trail_percent
-                else:
-                    raise ValueError("Trailing stop orders require trail_price or trail_percent")
+            builder(
+                order_params,
+                limit_price=limit_price,
+                stop_price=stop_price,
+                trail_price=trail_price,
+                trail_percent=trail_percent
+            )
             
             if client_order_id:
                 order_params['client_order_id'] = client_order_id
@@ -195,39 +620,10 @@ class AlpacaBroker(BaseBroker):
             order = self.api.submit_order(**order_params)
             
             # Convert to dict
-            order_data = {
-                'id': order.id,
-                'client_order_id': order.client_order_id,
-                'symbol': order.symbol,
-                'asset_id': order.asset_id,
-                'asset_class': order.asset_class,
-                'qty': float(order.qty),
-                'filled_qty': float(order.filled_qty),
-                'side': order.side,
-                'order_type': order.order_type,
-                'time_in_force': order.time_in_force,
-                'limit_price': float(order.limit_price) if order.limit_price else None,
-                'stop_price': float(order.stop_price) if order.stop_price else None,
-                'trail_price': float(order.trail_price) if order.trail_price else None,
-                'trail_percent': float(order.trail_percent) if order.trail_percent else None,
-                'status': order.status,
-                'extended_hours': order.extended_hours,
-                'created_at': order.created_at.isoformat() if order.created_at else None,
-                'updated_at': order.updated_at.isoformat() if order.updated_at else None,
-                'submitted_at': order.submitted_at.isoformat() if order.submitted_at else None,
-                'filled_at': order.filled_at.isoformat() if order.filled_at else None,
-                'expired_at': order.expired_at.isoformat() if order.expired_at else None,
-                'canceled_at': order.canceled_at.isoformat() if order.canceled_at else None,
-                'failed_at': order.failed_at.isoformat() if order.failed_at else None,
-                'replaced_at': order.replaced_at.isoformat() if order.replaced_at else None,
-                'filled_avg_price': float(order.filled_avg_price) if order.filled_avg_price else None,
-                'hwm': float(order.hwm) if order.hwm else None,
-                'legs': order.legs
-            }
+            order_data = AlpacaOrderDTO.from_entity(order).to_dict()
             
-            # Save to database
-            db_client = await get_mongodb_client()
-            await db_client.save_trade({
+            # Queue for background persistence (off the order path)
+            self._trade_queue.put_nowait({
                 'order_id': order.id,
                 'symbol': symbol,
                 'side': side,
@@ -247,7 +643,8 @@ class AlpacaBroker(BaseBroker):
     
     async def cancel_order(self, order_id: str) -> bool:
         """Cancel an order"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             self.api.cancel_order(order_id)
@@ -260,23 +657,23 @@ class AlpacaBroker(BaseBroker):
     
     async def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
         """Get order by ID"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
+        
+        # Terminal orders never change, so the stream cache is final for them;
+        # anything still open is confirmed over REST in case an update was missed
+        if self._stream_alive():
+            cached = self._order_cache.get(order_id)
+            if cached is not None and cached.get('status') in _TERMINAL_ORDER_STATUSES:
+                return dict(cached)
         
         try:
             order = self.api.get_order(order_id)
             
-            return {
-                'id': order.id,
-                'client_order_id': order.client_order_id,
-                'symbol': order.symbol,
-                'qty': float(order.qty),
-                'filled_qty': float(order.filled_qty),
-                'side': order.side,
-                'order_type': order.order_type,
-                'status': order.status,
-                'created_at': order.created_at.isoformat() if order.created_at else None,
-                'filled_avg_price': float(order.filled_avg_price) if order.filled_avg_price else None
-            }
+            result = AlpacaOrderDTO.from_entity(order).to_dict(_ORDER_DETAIL_KEYS)
+            if order_id in self._order_cache:
+                self._order_cache[order_id] = result
+            return dict(result)
             
         except APIError as e:
             logger.error(f"Error getting order {order_id}: {e}")
@@ -289,35 +686,26 @@ class AlpacaBroker(BaseBroker):
                         until: Optional[datetime] = None,
                         direction: str = 'desc',
                         nested: bool = True,
-                        symbols: Optional[str] = None) -> List[Dict[str, Any]]:
+                        symbols: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
         """Get orders with filters"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
-            orders = self.api.list_orders(
-                status=status,
-                limit=limit,
-                after=after,
-                until=until,
-                direction=direction,
-                nested=nested,
-                symbols=symbols
-            )
-            
-            order_list = []
-            for order in orders:
-                order_data = {
-                    'id': order.id,
-                    'symbol': order.symbol,
-                    'qty': float(order.qty),
-                    'filled_qty': float(order.filled_qty),
-                    'side': order.side,
-                    'order_type': order.order_type,
-                    'status': order.status,
-                    'created_at': order.created_at.isoformat() if order.created_at else None,
-                    'filled_avg_price': float(order.filled_avg_price) if order.filled_avg_price else None
-                }
-                order_list.append(order_data)
+            # Raw GET /orders: map the JSON straight to the response schema
+            # instead of building an Order entity per row
+            params = {'limit': limit, 'direction': direction, 'nested': nested}
+            if status is not None:
+                params['status'] = status
+            if after is not None:
+                params['after'] = after.isoformat()
+            if until is not None:
+                params['until'] = until.isoformat()
+            if symbols:
+                params['symbols'] = symbols if isinstance(symbols, str) else ','.join(symbols)
+            
+            raw_orders = await asyncio.to_thread(self.api.get, '/orders', params)
+            order_list = [_order_summary_from_raw(o) for o in raw_orders]
             
             return order_list
             
@@ -332,7 +720,8 @@ class AlpacaBroker(BaseBroker):
                              end: Optional[datetime] = None,
                              limit: int = 1000) -> List[Dict[str, Any]]:
         """Get market data for symbol"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             # Convert timeframe to Alpaca format
@@ -370,23 +759,61 @@ class AlpacaBroker(BaseBroker):
             logger.error(f"Error getting market data for {symbol}: {e}")
             raise
     
+    async def get_market_data_np(self,
+                                 symbol: str,
+                                 timeframe: str = '1Day',
+                                 start: Optional[datetime] = None,
+                                 end: Optional[datetime] = None,
+                                 limit: int = 1000) -> Dict[str, Any]:
+        """Get market data for symbol as NumPy columns (no per-row dicts)"""
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
+        
+        try:
+            bars = self.api.get_bars(
+                symbol,
+                self._convert_timeframe(timeframe),
+                start=start,
+                end=end,
+                limit=limit
+            ).df
+            
+            return {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'columns': _OHLCV_COLUMNS,
+                'timestamp': bars.index.values.astype('datetime64[ns]'),
+                'ohlcv': bars.reindex(columns=list(_OHLCV_COLUMNS), fill_value=0).to_numpy(dtype='float64')
+            }
+            
+        except APIError as e:
+            logger.error(f"Error getting market data for {symbol}: {e}")
+            raise
+    
+    async def get_latest_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Get latest trade price for several symbols in a single request"""
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
+        
+        if not symbols:
+            return {}
+        
+        try:
+            trades = await asyncio.to_thread(self.api.get_latest_trades, list(symbols))
+            return {symbol: float(trade.price) for symbol, trade in trades.items()}
+            
+        except APIError as e:
+            logger.error(f"Error getting latest prices for {symbols}: {e}")
+            raise
+    
     def _convert_timeframe(self, timeframe: str) -> str:
         """Convert timeframe to Alpaca format"""
-        timeframe_map = {
-            '1m': '1Min',
-            '5m': '5Min',
-            '15m': '15Min',
-            '30m': '30Min',
-            '1h': '1Hour',
-            '1d': '1Day',
-            '1w': '1Week',
-            '1M': '1Month'
-        }
-        return timeframe_map.get(timeframe, '1Day')
+        return _TIMEFRAME_MAP.get(timeframe, '1Day')
     
     async def get_asset_info(self, symbol: str) -> Optional[Dict[str, Any]]:
         """Get asset information"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             asset = self.api.get_asset(symbol)
@@ -414,7 +841,8 @@ class AlpacaBroker(BaseBroker):
                                    timeframe: str = '1D',
                                    extended_hours: bool = False) -> Dict[str, Any]:
         """Get portfolio history"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             history = self.api.get_portfolio_history(
@@ -423,11 +851,13 @@ class AlpacaBroker(BaseBroker):
                 extended_hours=extended_hours
             )
             
+            # Keep series as NumPy arrays (timestamps as epoch seconds);
+            # callers convert on demand or serialize via serialize_portfolio_history()
             return {
-                'timestamp': [ts.isoformat() for ts in history.timestamp],
-                'equity': [float(eq) for eq in history.equity],
-                'profit_loss': [float(pl) for pl in history.profit_loss],
-                'profit_loss_pct': [float(plp) for plp in history.profit_loss_pct],
+                'timestamp': np.asarray(history.timestamp, dtype='int64'),
+                'equity': np.asarray(history.equity, dtype='float64'),
+                'profit_loss': np.asarray(history.profit_loss, dtype='float64'),
+                'profit_loss_pct': np.asarray(history.profit_loss_pct, dtype='float64'),
                 'base_value': float(history.base_value),
                 'timeframe': history.timeframe
             }
@@ -438,7 +868,8 @@ class AlpacaBroker(BaseBroker):
     
     async def close_position(self, symbol: str, qty: Optional[float] = None) -> Dict[str, Any]:
         """Close position (partial or full)"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             if qty:
@@ -464,7 +895,8 @@ class AlpacaBroker(BaseBroker):
     
     async def close_all_positions(self) -> List[Dict[str, Any]]:
         """Close all positions"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             orders = self.api.close_all_positions()
@@ -489,10 +921,11 @@ class AlpacaBroker(BaseBroker):
     
     async def get_clock(self) -> Dict[str, Any]:
         """Get market clock"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
-            clock = self.api.get_clock()
+            clock = await asyncio.to_thread(self.api.get_clock)
             
             return {
                 'timestamp': clock.timestamp.isoformat(),
@@ -507,7 +940,8 @@ class AlpacaBroker(BaseBroker):
     
     async def get_calendar(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Get market calendar"""
-        self._validate_connection()
+        if not self.connected:
+            raise ConnectionError(_NOT_CONNECTED_MSG)
         
         try:
             calendar = self.api.get_calendar(start=start, end=end)
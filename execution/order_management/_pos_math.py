@@ -0,0 +1,51 @@
+"""
+Cálculo de posiciones compilado con Numba.
+
+Aritmética escalar que se ejecuta en cada fill; si Numba no está
+instalado se usa la misma función en Python puro.
+"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Sustituto sin compilación cuando Numba no está disponible."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True, fastmath=True)
+def update_position(size: float, avg: float, sign: float, qty: float, price: float):
+    """
+    Aplicar un fill a una posición.
+
+    Args:
+        size: Tamaño actual (positivo = largo, negativo = corto)
+        avg: Precio promedio actual
+        sign: 1.0 para compra, -1.0 para venta
+        qty: Cantidad ejecutada
+        price: Precio de ejecución
+
+    Returns:
+        Tupla (nuevo tamaño, nuevo precio promedio)
+    """
+    new_size = size + sign * qty
+
+    if new_size == 0.0:
+        # Posición cerrada
+        return new_size, avg
+
+    if size * sign > 0.0:
+        # Aumentar posición existente (largo o corto)
+        return new_size, (size * avg + sign * qty * price) / new_size
+
+    if abs(new_size) < abs(size):
+        # Reducir posición - mantener precio promedio
+        return new_size, avg
+
+    # Nueva posición en dirección opuesta
+    return new_size, price
@@ -6,54 +6,75 @@ seguimiento y optimización de trades en múltiples exchanges.
 """
 
 import asyncio
-import uuid
-from typing import Dict, List, Optional, Any, Callable
+import heapq
+import itertools
+import os
+import time
+from typing import Dict, List, Optional, Any, Callable, Set, Deque, Tuple
+from collections import deque
+from uuid import uuid4
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from enum import Enum
-import json
+from datetime import datetime
+from enum import IntEnum
+
+import numpy as np
 
 from data.feeds.market_data import MarketDataManager
+from execution.order_management._pos_math import update_position
 from risk_management.portfolio.risk_manager import RiskManager
 from utils.config.settings import Settings
 from utils.logging.logger import trading_logger
 
 
-class OrderType(Enum):
+class OrderType(IntEnum):
     """Tipos de órdenes."""
-    MARKET = "market"
-    LIMIT = "limit"
-    STOP = "stop"
-    STOP_LIMIT = "stop_limit"
-    TRAILING_STOP = "trailing_stop"
+    MARKET = 0
+    LIMIT = 1
+    STOP = 2
+    STOP_LIMIT = 3
+    TRAILING_STOP = 4
 
 
-class OrderSide(Enum):
+class OrderSide(IntEnum):
     """Lado de la orden."""
-    BUY = "buy"
-    SELL = "sell"
+    BUY = 0
+    SELL = 1
 
 
-class OrderStatus(Enum):
+class OrderStatus(IntEnum):
     """Estados de órdenes."""
-    PENDING = "pending"
-    SUBMITTED = "submitted"
-    PARTIALLY_FILLED = "partially_filled"
-    FILLED = "filled"
-    CANCELLED = "cancelled"
-    REJECTED = "rejected"
-    EXPIRED = "expired"
+    PENDING = 0
+    SUBMITTED = 1
+    PARTIALLY_FILLED = 2
+    FILLED = 3
+    CANCELLED = 4
+    REJECTED = 5
+    EXPIRED = 6
+
+
+# Conjuntos de estados precalculados (pertenencia O(1) sin crear listas)
+_ACTIVE_STATUSES = frozenset({OrderStatus.PENDING, OrderStatus.SUBMITTED, OrderStatus.PARTIALLY_FILLED})
+_STOP_TYPES = frozenset({OrderType.STOP, OrderType.STOP_LIMIT})
+
+# Los timestamps internos son time.monotonic_ns(); este desfase los
+# convierte a hora de pared solo cuando se exponen como datetime
+_EPOCH_OFFSET_NS = time.time_ns() - time.monotonic_ns()
 
 
-class TimeInForce(Enum):
+def _ns_to_datetime(ns: int) -> datetime:
+    """Convertir un timestamp monotónico (ns) a datetime local."""
+    return datetime.fromtimestamp((ns + _EPOCH_OFFSET_NS) / 1e9)
+
+
+class TimeInForce(IntEnum):
     """Tiempo en vigor de la orden."""
-    GTC = "gtc"  # Good Till Cancelled
-    IOC = "ioc"  # Immediate Or Cancel
-    FOK = "fok"  # Fill Or Kill
-    DAY = "day"  # Day order
+    GTC = 0  # Good Till Cancelled
+    IOC = 1  # Immediate Or Cancel
+    FOK = 2  # Fill Or Kill
+    DAY = 3  # Day order
 
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """Orden de trading."""
     id: str
@@ -67,7 +88,7 @@ class Order:
     status: OrderStatus = OrderStatus.PENDING
     
     # Timestamps
-    created_at: datetime = field(default_factory=datetime.now)
+    created_at_ns: int = field(default_factory=time.monotonic_ns)
     submitted_at: Optional[datetime] = None
     filled_at: Optional[datetime] = None
     
@@ -81,15 +102,21 @@ class Order:
     client_order_id: Optional[str] = None
     exchange_order_id: Optional[str] = None
     parent_order_id: Optional[str] = None  # Para órdenes OCO
+    trigger_on: Optional[str] = None  # "parent_filled": se activa al ejecutarse la padre
     
     # Configuración adicional
     reduce_only: bool = False
     post_only: bool = False
     
+    @property
+    def created_at(self) -> datetime:
+        """Fecha de creación."""
+        return _ns_to_datetime(self.created_at_ns)
+    
     @property
     def is_active(self) -> bool:
         """Verificar si la orden está activa."""
-        return self.status in [OrderStatus.PENDING, OrderStatus.SUBMITTED, OrderStatus.PARTIALLY_FILLED]
+        return self.status in _ACTIVE_STATUSES
     
     @property
     def is_filled(self) -> bool:
@@ -102,7 +129,7 @@ class Order:
         return self.quantity - self.filled_quantity
 
 
-@dataclass
+@dataclass(slots=True)
 class Fill:
     """Ejecución parcial de una orden."""
     id: str
@@ -112,11 +139,16 @@ class Fill:
     quantity: float
     price: float
     commission: float
-    timestamp: datetime = field(default_factory=datetime.now)
+    timestamp_ns: int = field(default_factory=time.monotonic_ns)
     trade_id: Optional[str] = None
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Momento de la ejecución."""
+        return _ns_to_datetime(self.timestamp_ns)
 
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     """Posición de trading."""
     symbol: str
@@ -124,7 +156,12 @@ class Position:
     avg_price: float = 0.0
     unrealized_pnl: float = 0.0
     realized_pnl: float = 0.0
-    last_update: datetime = field(default_factory=datetime.now)
+    last_update_ns: int = field(default_factory=time.monotonic_ns)
+    
+    @property
+    def last_update(self) -> datetime:
+        """Última actualización."""
+        return _ns_to_datetime(self.last_update_ns)
     
     @property
     def is_long(self) -> bool:
@@ -160,6 +197,46 @@ class OrderManager:
         self.orders: Dict[str, Order] = {}
         self.fills: Dict[str, Fill] = {}
         self.positions: Dict[str, Position] = {}
+        self._positions_snapshot: Optional[Dict[str, Dict[str, float]]] = None
+        
+        # Índice de órdenes activas (evita recorrer todo el historial)
+        self._active_orders: Dict[str, Order] = {}
+        self._active_by_symbol: Dict[str, Set[str]] = {}
+        
+        # Órdenes y fills finalizados (acotados)
+        self._archived_orders: Deque[Order] = deque(maxlen=settings.ORDER_ARCHIVE_SIZE)
+        self._archived_by_id: Dict[str, Order] = {}
+        self._archived_fills: Deque[Fill] = deque(maxlen=settings.ORDER_ARCHIVE_SIZE)
+        
+        # Historial en columnas (SoA) para filtrar sin recorrer objetos;
+        # el orden de registro ya es cronológico, no hace falta ordenar
+        self._hist_len = 0
+        self._hist_ids = np.empty(1024, dtype=object)
+        self._hist_symbols = np.empty(1024, dtype=object)
+        
+        # Procesador de lógica de negocio: una única tarea aplica todas las
+        # mutaciones de órdenes/posiciones leyendo comandos de una cola
+        self._cmd_queue: Optional[asyncio.Queue] = None
+        self._bl_task: Optional[asyncio.Task] = None
+        self._bl_handlers: Dict[str, Callable] = {
+            "submit": self._bl_submit,
+            "submitted": self._bl_submitted,
+            "cancel": self._bl_cancel,
+            "cancelled": self._bl_cancelled,
+            "fill": self._bl_fill,
+            "tick": self._bl_tick,
+            "mark": self._bl_mark,
+        }
+        self._io_tasks: Set[asyncio.Task] = set()
+        
+        # Libro de órdenes limit en paper: por símbolo, un heap de niveles de
+        # precio por lado ('bid' con clave -precio, 'ask' con clave precio);
+        # cada nivel es una cola FIFO de IDs. El índice da acceso O(1) al nivel.
+        self._paper_book: Dict[str, Dict[str, List[Tuple[float, Deque[str]]]]] = {}
+        self._paper_book_index: Dict[Tuple[str, str, float], Deque[str]] = {}
+        
+        # Hijas condicionadas (trigger_on="parent_filled") a la espera de su padre
+        self._armed_children: Dict[str, List[Order]] = {}
         
         # Callbacks
         self.order_callbacks: List[Callable] = []
@@ -170,6 +247,10 @@ class OrderManager:
         self.commission_rate = 0.001  # 0.1%
         self.slippage_rate = 0.0001   # 0.01%
         
+        # Generador de IDs internos (contador monotónico por proceso)
+        self._id_counter = itertools.count(1)
+        self._id_prefix = f"{os.getpid():x}"
+        
         # Estado del manager
         self.is_running = False
         self.last_update = datetime.now()
@@ -181,63 +262,54 @@ class OrderManager:
         # Cargar estado previo si existe
         await self._load_state()
         
+        self._start_processor()
+        
         self.is_running = True
         trading_logger.logger.info("✅ Order Manager inicializado")
     
-    async def submit_order(self, order: Order) -> bool:
+    async def submit_order(self, order: Order, skip_validation: bool = False) -> bool:
         """
         Enviar orden al mercado.
         
         Args:
             order: Orden a enviar
+            skip_validation: Omitir validación y risk manager (órdenes hijas
+                de una entrada ya validada)
         
         Returns:
             True si la orden fue enviada exitosamente
         """
         try:
-            # Validar orden
-            validation_result = await self._validate_order(order)
-            if not validation_result[0]:
-                trading_logger.logger.warning(f"⚠️ Orden rechazada: {validation_result[1]}")
-                order.status = OrderStatus.REJECTED
-                return False
-            
-            # Generar IDs
-            if not order.client_order_id:
-                order.client_order_id = f"order_{uuid.uuid4().hex[:8]}"
-            
-            # Simular envío al exchange
-            if self.settings.TRADING_MODE == "paper":
-                success = await self._submit_paper_order(order)
-            else:
-                success = await self._submit_live_order(order)
-            
-            if success:
-                order.status = OrderStatus.SUBMITTED
-                order.submitted_at = datetime.now()
-                self.orders[order.id] = order
-                
-                # Notificar callbacks
-                await self._notify_order_callbacks(order, "submitted")
-                
-                trading_logger.trade_executed(
-                    symbol=order.symbol,
-                    action=order.side.value,
-                    quantity=order.quantity,
-                    price=order.price or 0.0,
-                    order_id=order.id
-                )
-                
-                return True
-            else:
-                order.status = OrderStatus.REJECTED
-                return False
-                
+            results = await self._request("submit", [order], skip_validation)
+            return results[0]
         except Exception as e:
-            trading_logger.logger.error(f"❌ Error enviando orden {order.id}: {e}")
+            trading_logger.logger.error("❌ Error enviando orden %s: %s", order.id, e)
             order.status = OrderStatus.REJECTED
             return False
     
+    async def submit_orders(self, orders: List[Order], skip_validation: bool = False) -> List[bool]:
+        """
+        Enviar varias órdenes en lote.
+        
+        Las órdenes se validan una a una y se agrupan por exchange para
+        enviarlas en una sola llamada; en paper se procesan concurrentemente.
+        
+        Args:
+            orders: Órdenes a enviar
+            skip_validation: Omitir validación y risk manager
+        
+        Returns:
+            Lista con el resultado de cada orden (mismo orden que la entrada)
+        """
+        try:
+            return await self._request("submit", orders, skip_validation)
+        except Exception as e:
+            trading_logger.logger.error("❌ Error enviando lote de órdenes: %s", e)
+            for order in orders:
+                if order.status == OrderStatus.PENDING:
+                    order.status = OrderStatus.REJECTED
+            return [False] * len(orders)
+    
     async def cancel_order(self, order_id: str) -> bool:
         """
         Cancelar una orden.
@@ -249,34 +321,399 @@ class OrderManager:
             True si la orden fue cancelada exitosamente
         """
         try:
-            if order_id not in self.orders:
-                trading_logger.logger.warning(f"⚠️ Orden {order_id} no encontrada")
-                return False
+            return await self._request("cancel", order_id)
+        except Exception as e:
+            trading_logger.logger.error("❌ Error cancelando orden %s: %s", order_id, e)
+            return False
+    
+    # ------------------------------------------------------------------
+    # Procesador de lógica de negocio (BLP)
+    #
+    # Toda mutación de órdenes, fills y posiciones ocurre en una única
+    # tarea que consume self._cmd_queue. Los handlers _bl_* son síncronos
+    # y trabajan solo en memoria; la E/S con el exchange se ejecuta en
+    # tareas aparte que publican su resultado como un nuevo comando, y los
+    # callbacks se lanzan fuera del procesador. No hace falta ningún lock.
+    # ------------------------------------------------------------------
+    
+    def _start_processor(self):
+        """Arrancar la tarea del procesador si no está en marcha."""
+        if self._bl_task is None or self._bl_task.done():
+            self._cmd_queue = asyncio.Queue()
+            self._bl_task = asyncio.create_task(self._business_logic_loop())
+    
+    async def _stop_processor(self):
+        """Drenar la cola y detener el procesador."""
+        if self._bl_task is None:
+            return
+        
+        # Esperar la E/S pendiente y los comandos que publica; procesar un
+        # comando puede lanzar más E/S, así que se repite hasta que ambas
+        # queden vacías antes de enviar el centinela
+        while True:
+            if self._io_tasks:
+                await asyncio.gather(*self._io_tasks, return_exceptions=True)
+                continue
+            await self._cmd_queue.join()
+            if not self._io_tasks:
+                break
+        
+        self._cmd_queue.put_nowait(None)
+        await self._bl_task
+        self._bl_task = None
+    
+    async def _request(self, cmd: str, *args) -> Any:
+        """Encolar un comando y esperar su resultado."""
+        self._start_processor()
+        future = asyncio.get_running_loop().create_future()
+        self._cmd_queue.put_nowait((cmd, (*args, future)))
+        return await future
+    
+    def _post(self, cmd: str, *args):
+        """Publicar un comando interno (resultado de E/S) en la cola."""
+        self._cmd_queue.put_nowait((cmd, args))
+    
+    def _spawn(self, coro):
+        """Lanzar una tarea fuera del procesador manteniendo su referencia."""
+        task = asyncio.create_task(coro)
+        self._io_tasks.add(task)
+        task.add_done_callback(self._io_tasks.discard)
+    
+    @staticmethod
+    def _resolve(future: Optional[asyncio.Future], result: Any):
+        """Completar el future del solicitante si sigue esperando."""
+        if future is not None and not future.done():
+            future.set_result(result)
+    
+    async def _business_logic_loop(self):
+        """Consumir comandos de la cola y aplicarlos de uno en uno."""
+        while True:
+            item = await self._cmd_queue.get()
+            if item is None:
+                self._cmd_queue.task_done()
+                break
             
-            order = self.orders[order_id]
+            cmd, args = item
+            try:
+                self._bl_handlers[cmd](*args)
+            except Exception as e:
+                trading_logger.logger.error("❌ Error procesando comando %s: %s", cmd, e)
+                future = args[-1] if args and isinstance(args[-1], asyncio.Future) else None
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            finally:
+                # Permite a _stop_processor esperar con join()
+                self._cmd_queue.task_done()
+    
+    def _bl_submit(self, orders: List[Order], skip_validation: bool, future: asyncio.Future):
+        """Validar órdenes y delegar el envío al exchange."""
+        results = [False] * len(orders)
+        accepted: List[int] = []
+        
+        accepted_ids: Set[str] = set()
+        
+        for i, order in enumerate(orders):
+            if order.trigger_on == "parent_filled" and order.parent_order_id not in accepted_ids:
+                # Hija condicionada: su padre debe ir validada en el mismo lote o seguir viva
+                parent = self._lookup_order(order.parent_order_id)
+                if parent is None or not (parent.is_active or parent.is_filled):
+                    trading_logger.logger.warning("⚠️ Orden rechazada: orden padre %s no válida", order.parent_order_id)
+                    order.status = OrderStatus.REJECTED
+                    continue
             
-            if not order.is_active:
-                trading_logger.logger.warning(f"⚠️ Orden {order_id} no está activa")
-                return False
+            # Las hijas de una padre del mismo lote heredan su validación
+            inherited = order.reduce_only and order.parent_order_id in accepted_ids
+            validation_result = (True, "") if skip_validation or inherited else self._validate_order(order)
+            if not validation_result[0]:
+                trading_logger.logger.warning("⚠️ Orden rechazada: %s", validation_result[1])
+                order.status = OrderStatus.REJECTED
+                continue
+            
+            # Generar IDs
+            if not order.client_order_id:
+                order.client_order_id = f"order_{uuid4().hex[:8]}"
+            
+            accepted.append(i)
+            accepted_ids.add(order.id)
+        
+        if not accepted:
+            self._resolve(future, results)
+            return
+        
+        self._spawn(self._exchange_submit(orders, accepted, results, future))
+    
+    async def _exchange_submit(
+        self,
+        orders: List[Order],
+        accepted: List[int],
+        results: List[bool],
+        future: asyncio.Future
+    ):
+        """E/S de envío (fuera del procesador); publica el resultado en la cola."""
+        sent_indices: List[int] = []
+        sent_results: List[bool] = []
+        paper = self.settings.TRADING_MODE == "paper"
+        
+        try:
+            if paper:
+                sent_indices = accepted
+                sent_results = await asyncio.gather(
+                    *(self._submit_paper_order(orders[i]) for i in accepted)
+                )
+            else:
+                # Agrupar por exchange para enviar cada lote en una sola llamada
+                batches: Dict[str, List[int]] = {}
+                for i in accepted:
+                    batches.setdefault(orders[i].exchange, []).append(i)
+                
+                for exchange, batch in batches.items():
+                    sent_indices.extend(batch)
+                    sent_results.extend(
+                        await self._submit_live_batch(exchange, [orders[i] for i in batch])
+                    )
+        except Exception as e:
+            trading_logger.logger.error("❌ Error enviando órdenes al exchange: %s", e)
+        
+        self._post("submitted", orders, sent_indices, sent_results, results, future)
+        
+        # En paper trading, las órdenes market se ejecutan inmediatamente
+        if paper:
+            market_orders = [
+                orders[i] for i, ok in zip(sent_indices, sent_results)
+                if ok and orders[i].type == OrderType.MARKET
+            ]
+            prices = await asyncio.gather(
+                *(self._quote_fill_price(order) for order in market_orders)
+            )
+            for order, fill_price in zip(market_orders, prices):
+                if fill_price is not None:
+                    self._post("fill", order, fill_price)
             
-            # Simular cancelación
+            # Las limit nuevas pueden cruzar el precio actual
+            limit_symbols = {
+                orders[i].symbol for i, ok in zip(sent_indices, sent_results)
+                if ok and orders[i].type == OrderType.LIMIT
+            }
+            await asyncio.gather(*(self._post_paper_quote(symbol) for symbol in limit_symbols))
+    
+    def _bl_submitted(
+        self,
+        orders: List[Order],
+        sent_indices: List[int],
+        sent_results: List[bool],
+        results: List[bool],
+        future: asyncio.Future
+    ):
+        """Registrar el resultado del envío de un lote."""
+        for i, success in zip(sent_indices, sent_results):
+            if success:
+                self._register_submitted(orders[i])
+                results[i] = True
+            else:
+                orders[i].status = OrderStatus.REJECTED
+        
+        # Órdenes que no llegaron a enviarse (error de E/S)
+        for i, order in enumerate(orders):
+            if order.status == OrderStatus.PENDING:
+                order.status = OrderStatus.REJECTED
+        
+        self._resolve(future, results)
+    
+    def _register_submitted(self, order: Order):
+        """Registrar una orden aceptada por el exchange."""
+        if order.status == OrderStatus.PENDING:
+            order.status = OrderStatus.SUBMITTED
+        order.submitted_at = datetime.now()
+        self._append_history(order)
+        if order.is_active:
+            self.orders[order.id] = order
+            self._index_active(order)
+        
+        # Notificar callbacks
+        self._spawn(self._notify_order_callbacks(order, "submitted"))
+        
+        trading_logger.trade_executed(
+            symbol=order.symbol,
+            action=order.side.name.lower(),
+            quantity=order.quantity,
+            price=order.price or 0.0,
+            order_id=order.id
+        )
+        
+        if not order.is_active:
+            return
+        
+        if order.trigger_on == "parent_filled":
+            parent = self._lookup_order(order.parent_order_id)
+            if parent is not None and parent.is_active:
+                # Hija condicionada: queda armada hasta que se ejecute la padre
+                self._armed_children.setdefault(parent.id, []).append(order)
+            else:
+                self._release_children(parent, [order])
+        else:
+            self._activate_child(order)
+    
+    def _bl_cancel(self, order_id: str, future: asyncio.Future):
+        """Comprobar que la orden es cancelable y delegar la cancelación."""
+        order = self.orders.get(order_id)
+        if order is None:
+            trading_logger.logger.warning("⚠️ Orden %s no encontrada", order_id)
+            self._resolve(future, False)
+            return
+        
+        if not order.is_active:
+            trading_logger.logger.warning("⚠️ Orden %s no está activa", order_id)
+            self._resolve(future, False)
+            return
+        
+        self._spawn(self._exchange_cancel(order, future))
+    
+    async def _exchange_cancel(self, order: Order, future: asyncio.Future):
+        """E/S de cancelación (fuera del procesador)."""
+        try:
             if self.settings.TRADING_MODE == "paper":
                 success = await self._cancel_paper_order(order)
             else:
                 success = await self._cancel_live_order(order)
-            
-            if success:
-                order.status = OrderStatus.CANCELLED
-                await self._notify_order_callbacks(order, "cancelled")
-                
-                trading_logger.logger.info(f"🚫 Orden {order_id} cancelada")
-                return True
-            
-            return False
-            
         except Exception as e:
-            trading_logger.logger.error(f"❌ Error cancelando orden {order_id}: {e}")
-            return False
+            trading_logger.logger.error("❌ Error cancelando orden %s: %s", order.id, e)
+            success = False
+        
+        self._post("cancelled", order, success, future)
+    
+    def _bl_cancelled(self, order: Order, success: bool, future: asyncio.Future):
+        """Aplicar una cancelación confirmada por el exchange."""
+        # La orden pudo ejecutarse mientras se cancelaba
+        if not success or not order.is_active:
+            self._resolve(future, False)
+            return
+        
+        order.status = OrderStatus.CANCELLED
+        self._on_order_done(order)
+        self._spawn(self._notify_order_callbacks(order, "cancelled"))
+        
+        trading_logger.logger.info("🚫 Orden %s cancelada", order.id)
+        self._resolve(future, True)
+    
+    def _bl_fill(self, order: Order, fill_price: float):
+        """Aplicar la ejecución completa de una orden."""
+        if not order.is_active:
+            return
+        
+        # Crear fill
+        fill = Fill(
+            id=self._next_id("fill"),
+            order_id=order.id,
+            symbol=order.symbol,
+            side=order.side,
+            quantity=order.quantity,
+            price=fill_price,
+            commission=order.quantity * fill_price * self.commission_rate
+        )
+        
+        # Actualizar orden
+        order.filled_quantity = order.quantity
+        order.avg_fill_price = fill_price
+        order.commission = fill.commission
+        order.status = OrderStatus.FILLED
+        order.filled_at = datetime.now()
+        
+        # Guardar fill
+        self.fills[fill.id] = fill
+        self._on_order_done(order)
+        if order.trigger_on == "parent_filled" and self.settings.TRADING_MODE == "paper":
+            self._cancel_oco_siblings(order)
+        
+        # Actualizar posición
+        self._update_position(fill)
+        
+        # Notificar callbacks
+        self._spawn(self._notify_fill_callbacks(fill))
+        self._spawn(self._notify_order_callbacks(order, "filled"))
+        
+        trading_logger.logger.info(
+            "✅ Orden ejecutada: %s %s %s @ $%.2f",
+            order.side.name.lower(), order.quantity, order.symbol, fill_price
+        )
+    
+    def on_ticker(self, symbol: str, bid: float, ask: float):
+        """
+        Notificar un precio de mercado: casa las limit en paper y
+        actualiza el PnL no realizado de la posición.
+        
+        Args:
+            symbol: Símbolo del activo
+            bid: Mejor precio de compra
+            ask: Mejor precio de venta
+        """
+        if symbol in self._paper_book or symbol in self.positions:
+            self._start_processor()
+            self._post("tick", symbol, bid, ask)
+    
+    async def _post_paper_quote(self, symbol: str):
+        """Obtener el ticker (E/S) y publicarlo como tick."""
+        try:
+            ticker = await self.market_data.get_ticker(symbol)
+            if ticker:
+                self._post("tick", symbol, ticker.bid, ticker.ask)
+        except Exception as e:
+            trading_logger.logger.error("❌ Error obteniendo ticker de %s: %s", symbol, e)
+    
+    def _book_insert(self, order: Order):
+        """Añadir una limit al libro de paper (O(1) si el nivel existe, O(log P) si no)."""
+        side = 'bid' if order.side is OrderSide.BUY else 'ask'
+        key = (order.symbol, side, order.price)
+        level = self._paper_book_index.get(key)
+        if level is None:
+            level = deque()
+            self._paper_book_index[key] = level
+            heap = self._paper_book.setdefault(order.symbol, {'bid': [], 'ask': []})[side]
+            heapq.heappush(heap, (-order.price if side == 'bid' else order.price, level))
+        level.append(order.id)
+    
+    def _book_remove(self, order: Order):
+        """Quitar una orden de su nivel; los niveles vacíos se descartan al llegar al tope."""
+        side = 'bid' if order.side is OrderSide.BUY else 'ask'
+        level = self._paper_book_index.get((order.symbol, side, order.price))
+        if level is not None and order.id in level:
+            level.remove(order.id)
+    
+    def _bl_tick(self, symbol: str, bid: float, ask: float):
+        """Casar las limit en paper que cruzan el precio de mercado."""
+        book = self._paper_book.get(symbol)
+        if book is None:
+            self._bl_mark([symbol], [(bid + ask) / 2])
+            return
+        
+        # Compras con precio >= ask y ventas con precio <= bid
+        self._match_side(symbol, 'bid', book['bid'], lambda price: price >= ask)
+        self._match_side(symbol, 'ask', book['ask'], lambda price: price <= bid)
+        
+        if not book['bid'] and not book['ask']:
+            del self._paper_book[symbol]
+        
+        self._bl_mark([symbol], [(bid + ask) / 2])
+    
+    def _match_side(
+        self,
+        symbol: str,
+        side: str,
+        heap: List[Tuple[float, Deque[str]]],
+        crosses: Callable[[float], bool]
+    ):
+        """Ejecutar niveles desde el tope del heap mientras crucen."""
+        while heap:
+            key, level = heap[0]
+            price = -key if side == 'bid' else key
+            if level and not crosses(price):
+                break
+            
+            heapq.heappop(heap)
+            del self._paper_book_index[(symbol, side, price)]
+            while level:
+                order = self.orders.get(level.popleft())
+                if order is not None and order.is_active:
+                    self._bl_fill(order, price)
     
     async def modify_order(
         self,
@@ -296,12 +733,8 @@ class OrderManager:
             True si la orden fue modificada exitosamente
         """
         try:
-            if order_id not in self.orders:
-                return False
-            
-            order = self.orders[order_id]
-            
-            if not order.is_active:
+            order = self.orders.get(order_id)
+            if order is None or not order.is_active:
                 return False
             
             # Cancelar orden original
@@ -311,7 +744,7 @@ class OrderManager:
             
             # Crear nueva orden modificada
             new_order = Order(
-                id=f"mod_{uuid.uuid4().hex[:8]}",
+                id=self._next_id("mod"),
                 symbol=order.symbol,
                 side=order.side,
                 type=order.type,
@@ -327,7 +760,7 @@ class OrderManager:
             return await self.submit_order(new_order)
             
         except Exception as e:
-            trading_logger.logger.error(f"❌ Error modificando orden {order_id}: {e}")
+            trading_logger.logger.error("❌ Error modificando orden %s: %s", order_id, e)
             return False
     
     async def create_bracket_order(
@@ -354,66 +787,94 @@ class OrderManager:
             Lista de IDs de órdenes creadas
         """
         try:
-            order_ids = []
-            
             # Orden de entrada
             entry_order = Order(
-                id=f"entry_{uuid.uuid4().hex[:8]}",
+                id=self._next_id("entry"),
                 symbol=symbol,
                 side=side,
                 type=OrderType.MARKET if entry_price is None else OrderType.LIMIT,
                 quantity=quantity,
                 price=entry_price
             )
+            bracket = [entry_order]
             
-            if await self.submit_order(entry_order):
-                order_ids.append(entry_order.id)
-                
-                # Esperar a que se ejecute la orden de entrada
-                await self._wait_for_fill(entry_order.id, timeout=60)
-                
-                if entry_order.is_filled:
-                    # Crear órdenes de salida
-                    exit_side = OrderSide.SELL if side == OrderSide.BUY else OrderSide.BUY
-                    
-                    # Stop loss
-                    if stop_loss_price:
-                        stop_order = Order(
-                            id=f"stop_{uuid.uuid4().hex[:8]}",
-                            symbol=symbol,
-                            side=exit_side,
-                            type=OrderType.STOP,
-                            quantity=quantity,
-                            stop_price=stop_loss_price,
-                            parent_order_id=entry_order.id,
-                            reduce_only=True
-                        )
-                        
-                        if await self.submit_order(stop_order):
-                            order_ids.append(stop_order.id)
-                    
-                    # Take profit
-                    if take_profit_price:
-                        profit_order = Order(
-                            id=f"profit_{uuid.uuid4().hex[:8]}",
-                            symbol=symbol,
-                            side=exit_side,
-                            type=OrderType.LIMIT,
-                            quantity=quantity,
-                            price=take_profit_price,
-                            parent_order_id=entry_order.id,
-                            reduce_only=True
-                        )
-                        
-                        if await self.submit_order(profit_order):
-                            order_ids.append(profit_order.id)
+            # Órdenes de salida condicionadas a la ejecución de la entrada
+            exit_side = OrderSide.SELL if side == OrderSide.BUY else OrderSide.BUY
+            
+            # Stop loss
+            if stop_loss_price:
+                bracket.append(Order(
+                    id=self._next_id("stop"),
+                    symbol=symbol,
+                    side=exit_side,
+                    type=OrderType.STOP,
+                    quantity=quantity,
+                    stop_price=stop_loss_price,
+                    parent_order_id=entry_order.id,
+                    trigger_on="parent_filled",
+                    reduce_only=True
+                ))
+            
+            # Take profit
+            if take_profit_price:
+                bracket.append(Order(
+                    id=self._next_id("profit"),
+                    symbol=symbol,
+                    side=exit_side,
+                    type=OrderType.LIMIT,
+                    quantity=quantity,
+                    price=take_profit_price,
+                    parent_order_id=entry_order.id,
+                    trigger_on="parent_filled",
+                    reduce_only=True
+                ))
+            
+            # Entrada, stop y take profit en un solo lote: la posición queda
+            # protegida en cuanto se ejecuta la entrada, sin esperar otro envío
+            results = await self.submit_orders(bracket)
+            order_ids = [order.id for order, ok in zip(bracket, results) if ok]
             
             return order_ids
             
         except Exception as e:
-            trading_logger.logger.error(f"❌ Error creando bracket order: {e}")
+            trading_logger.logger.error("❌ Error creando bracket order: %s", e)
             return []
     
+    async def mark_to_market(self):
+        """Actualizar el PnL no realizado de todas las posiciones."""
+        symbols = list(self.positions)
+        if not symbols:
+            return
+        
+        # Tickers en paralelo; la valoración se aplica en el procesador
+        tickers = await asyncio.gather(
+            *(self.market_data.get_ticker(symbol) for symbol in symbols),
+            return_exceptions=True
+        )
+        quoted = [
+            (symbol, (ticker.bid + ticker.ask) / 2)
+            for symbol, ticker in zip(symbols, tickers)
+            if ticker and not isinstance(ticker, Exception)
+        ]
+        if quoted:
+            marked_symbols, mids = zip(*quoted)
+            await self._request("mark", list(marked_symbols), list(mids))
+    
+    def _bl_mark(self, symbols: List[str], mids: List[float], future: Optional[asyncio.Future] = None):
+        """Valorar posiciones a mercado en una sola pasada vectorizada."""
+        positions = [self.positions.get(symbol) for symbol in symbols]
+        marked = [i for i, pos in enumerate(positions) if pos is not None]
+        if marked:
+            sizes = np.fromiter((positions[i].size for i in marked), dtype=np.float64, count=len(marked))
+            avgs = np.fromiter((positions[i].avg_price for i in marked), dtype=np.float64, count=len(marked))
+            prices = np.fromiter((mids[i] for i in marked), dtype=np.float64, count=len(marked))
+            unrealized = sizes * (prices - avgs)
+            
+            for i, pnl in zip(marked, unrealized.tolist()):
+                positions[i].unrealized_pnl = pnl
+        
+        self._resolve(future, None)
+    
     async def get_position(self, symbol: str) -> Optional[Position]:
         """
         Obtener posición actual de un símbolo.
@@ -436,12 +897,13 @@ class OrderManager:
         Returns:
             Lista de órdenes abiertas
         """
-        orders = [order for order in self.orders.values() if order.is_active]
-        
         if symbol:
-            orders = [order for order in orders if order.symbol == symbol]
+            return [
+                self._active_orders[order_id]
+                for order_id in self._active_by_symbol.get(symbol, ())
+            ]
         
-        return orders
+        return list(self._active_orders.values())
     
     async def get_order_history(
         self,
@@ -458,17 +920,152 @@ class OrderManager:
         Returns:
             Lista de órdenes históricas
         """
-        orders = list(self.orders.values())
-        
+        # Máscara por símbolo sobre las columnas; se recorre desde el final
+        n = self._hist_len
+        ids = self._hist_ids[:n]
         if symbol:
-            orders = [order for order in orders if order.symbol == symbol]
+            ids = ids[self._hist_symbols[:n] == symbol]
+        
+        orders = []
+        for order_id in ids[::-1]:
+            order = self._lookup_order(order_id)
+            if order is None:
+                # Expulsada del archivo
+                continue
+            orders.append(order)
+            if len(orders) >= limit:
+                break
+        
+        return orders
+    
+    def _next_id(self, tag: str) -> str:
+        """Generar ID interno ordenado y trazable."""
+        return f"{tag}_{self._id_prefix}_{next(self._id_counter):08x}"
+    
+    def _append_history(self, order: Order):
+        """Añadir orden a las columnas del historial."""
+        n = self._hist_len
+        if n > 2 * (len(self.orders) + len(self._archived_orders)) + 1024:
+            # Compactar: descartar órdenes expulsadas del archivo
+            keep = np.fromiter(
+                (self._lookup_order(order_id) is not None for order_id in self._hist_ids[:n]),
+                dtype=bool,
+                count=n
+            )
+            kept = int(keep.sum())
+            self._hist_ids[:kept] = self._hist_ids[:n][keep]
+            self._hist_symbols[:kept] = self._hist_symbols[:n][keep]
+            self._hist_ids[kept:n] = None
+            self._hist_symbols[kept:n] = None
+            n = kept
+        
+        if n == len(self._hist_ids):
+            # Duplicar capacidad cuando el buffer se llena
+            for name in ('_hist_ids', '_hist_symbols'):
+                grown = np.empty(2 * n, dtype=object)
+                grown[:n] = getattr(self, name)
+                setattr(self, name, grown)
+        
+        self._hist_ids[n] = order.id
+        self._hist_symbols[n] = order.symbol
+        self._hist_len = n + 1
+    
+    def _archive(self, order: Order):
+        """Mover una orden finalizada (y sus fills) al archivo acotado."""
+        self.orders.pop(order.id, None)
         
-        # Ordenar por fecha de creación (más recientes primero)
-        orders.sort(key=lambda x: x.created_at, reverse=True)
+        if len(self._archived_orders) == self._archived_orders.maxlen:
+            evicted = self._archived_orders[0]
+            self._archived_by_id.pop(evicted.id, None)
+        self._archived_orders.append(order)
+        self._archived_by_id[order.id] = order
         
-        return orders[:limit]
+        # self.fills solo contiene fills de órdenes vivas, el recorrido es corto
+        done_fills = [fill_id for fill_id, fill in self.fills.items() if fill.order_id == order.id]
+        for fill_id in done_fills:
+            self._archived_fills.append(self.fills.pop(fill_id))
     
-    async def _validate_order(self, order: Order) -> tuple[bool, str]:
+    def _lookup_order(self, order_id: str) -> Optional[Order]:
+        """Buscar orden viva o archivada."""
+        order = self.orders.get(order_id)
+        if order is None:
+            order = self._archived_by_id.get(order_id)
+        return order
+    
+    def _index_active(self, order: Order):
+        """Registrar orden en el índice de órdenes activas."""
+        self._active_orders[order.id] = order
+        self._active_by_symbol.setdefault(order.symbol, set()).add(order.id)
+    
+    def _unindex_active(self, order: Order):
+        """Quitar orden del índice al pasar a un estado final."""
+        if self._active_orders.pop(order.id, None) is None:
+            return
+        
+        symbol_orders = self._active_by_symbol.get(order.symbol)
+        if symbol_orders is not None:
+            symbol_orders.discard(order.id)
+            if not symbol_orders:
+                del self._active_by_symbol[order.symbol]
+    
+    def _on_order_done(self, order: Order):
+        """Actualizar índices y liberar las órdenes hijas."""
+        self._unindex_active(order)
+        if order.type == OrderType.LIMIT:
+            self._book_remove(order)
+        self._archive(order)
+        
+        children = self._armed_children.pop(order.id, None)
+        if children:
+            self._release_children(order, children)
+    
+    def _activate_child(self, order: Order):
+        """Dejar una orden registrada lista para casarse en paper."""
+        if order.type == OrderType.LIMIT and self.settings.TRADING_MODE == "paper":
+            self._book_insert(order)
+    
+    def _release_children(self, parent: Optional[Order], children: List[Order]):
+        """Activar las hijas si la padre se ejecutó; cancelarlas si no."""
+        filled = parent is not None and parent.is_filled
+        for child in children:
+            if not child.is_active:
+                continue
+            
+            if filled:
+                self._activate_child(child)
+            else:
+                child.status = OrderStatus.CANCELLED
+                self._on_order_done(child)
+                self._spawn(self._notify_order_callbacks(child, "cancelled"))
+        
+        if filled and self.settings.TRADING_MODE == "paper":
+            # Las limit recién activadas pueden cruzar el precio actual
+            self._spawn(self._post_paper_quote(parent.symbol))
+    
+    def _cancel_oco_siblings(self, order: Order):
+        """En paper, la ejecución de una hija cancela a sus hermanas (OCO)."""
+        for sibling_id in list(self._active_by_symbol.get(order.symbol, ())):
+            sibling = self._active_orders[sibling_id]
+            if sibling.trigger_on == "parent_filled" and sibling.parent_order_id == order.parent_order_id:
+                sibling.status = OrderStatus.CANCELLED
+                self._on_order_done(sibling)
+                self._spawn(self._notify_order_callbacks(sibling, "cancelled"))
+    
+    def _current_positions(self) -> Dict[str, Dict[str, float]]:
+        """Posiciones en el formato del risk manager (cacheadas hasta el próximo fill)."""
+        if self._positions_snapshot is None:
+            self._positions_snapshot = {
+                symbol: {
+                    'size': pos.size,
+                    'price': pos.avg_price,
+                    'entry_price': pos.avg_price,
+                    'current_price': pos.avg_price  # Simplificado
+                }
+                for symbol, pos in self.positions.items()
+            }
+        return self._positions_snapshot
+    
+    def _validate_order(self, order: Order) -> tuple[bool, str]:
         """Validar orden antes de enviar."""
         try:
             # Validaciones básicas
@@ -478,19 +1075,11 @@ class OrderManager:
             if order.type == OrderType.LIMIT and order.price is None:
                 return False, "Precio requerido para orden limit"
             
-            if order.type in [OrderType.STOP, OrderType.STOP_LIMIT] and order.stop_price is None:
+            if order.type in _STOP_TYPES and order.stop_price is None:
                 return False, "Stop price requerido para orden stop"
             
             # Validar con risk manager
-            current_positions = {
-                symbol: {
-                    'size': pos.size,
-                    'price': pos.avg_price,
-                    'entry_price': pos.avg_price,
-                    'current_price': pos.avg_price  # Simplificado
-                }
-                for symbol, pos in self.positions.items()
-            }
+            current_positions = self._current_positions()
             
             # Simular valor del portafolio
             portfolio_value = self.settings.BACKTEST_INITIAL_CAPITAL
@@ -515,28 +1104,34 @@ class OrderManager:
     async def _submit_paper_order(self, order: Order) -> bool:
         """Simular envío de orden en paper trading."""
         try:
-            # Simular latencia
-            await asyncio.sleep(0.1)
-            
-            # En paper trading, las órdenes market se ejecutan inmediatamente
-            if order.type == OrderType.MARKET:
-                await self._simulate_fill(order)
+            # Simular latencia (0 en backtests para no serializar esperas)
+            if self.settings.PAPER_LATENCY > 0:
+                await asyncio.sleep(self.settings.PAPER_LATENCY)
             
             return True
             
         except Exception as e:
-            trading_logger.logger.error(f"❌ Error en paper order: {e}")
+            trading_logger.logger.error("❌ Error en paper order: %s", e)
             return False
     
     async def _submit_live_order(self, order: Order) -> bool:
         """Enviar orden real al exchange."""
-        # TODO: Implementar conexión real con exchange
+        # TODO: Implementar conexión real con exchange (con una sesión HTTP
+        # persistente creada en initialize() para reutilizar TCP+TLS)
         trading_logger.logger.warning("⚠️ Live trading no implementado aún")
         return False
     
+    async def _submit_live_batch(self, exchange: str, orders: List[Order]) -> List[bool]:
+        """Enviar un lote de órdenes reales a un exchange."""
+        # Sin endpoint de lote, las órdenes se envían en paralelo
+        return list(await asyncio.gather(
+            *(self._submit_live_order(order) for order in orders)
+        ))
+    
     async def _cancel_paper_order(self, order: Order) -> bool:
         """Simular cancelación en paper trading."""
-        await asyncio.sleep(0.05)  # Simular latencia
+        if self.settings.PAPER_LATENCY > 0:
+            await asyncio.sleep(self.settings.PAPER_LATENCY)  # Simular latencia
         return True
     
     async def _cancel_live_order(self, order: Order) -> bool:
@@ -545,139 +1140,74 @@ class OrderManager:
         trading_logger.logger.warning("⚠️ Live trading no implementado aún")
         return False
     
-    async def _simulate_fill(self, order: Order):
-        """Simular ejecución de orden."""
+    async def _quote_fill_price(self, order: Order) -> Optional[float]:
+        """Obtener precio de ejecución simulado (E/S, fuera del procesador)."""
         try:
             # Obtener precio actual
             ticker = await self.market_data.get_ticker(order.symbol)
             if not ticker:
-                return
+                return None
             
             # Determinar precio de ejecución
             if order.type == OrderType.MARKET:
                 if order.side == OrderSide.BUY:
-                    fill_price = ticker.ask * (1 + self.slippage_rate)
-                else:
-                    fill_price = ticker.bid * (1 - self.slippage_rate)
-            else:
-                fill_price = order.price
-            
-            # Crear fill
-            fill = Fill(
-                id=f"fill_{uuid.uuid4().hex[:8]}",
-                order_id=order.id,
-                symbol=order.symbol,
-                side=order.side,
-                quantity=order.quantity,
-                price=fill_price,
-                commission=order.quantity * fill_price * self.commission_rate
-            )
-            
-            # Actualizar orden
-            order.filled_quantity = order.quantity
-            order.avg_fill_price = fill_price
-            order.commission = fill.commission
-            order.status = OrderStatus.FILLED
-            order.filled_at = datetime.now()
-            
-            # Guardar fill
-            self.fills[fill.id] = fill
-            
-            # Actualizar posición
-            await self._update_position(fill)
-            
-            # Notificar callbacks
-            await self._notify_fill_callbacks(fill)
-            await self._notify_order_callbacks(order, "filled")
-            
-            trading_logger.logger.info(
-                f"✅ Orden ejecutada: {order.side.value} {order.quantity} {order.symbol} @ ${fill_price:.2f}"
-            )
+                    return ticker.ask * (1 + self.slippage_rate)
+                return ticker.bid * (1 - self.slippage_rate)
+            return order.price
             
         except Exception as e:
-            trading_logger.logger.error(f"❌ Error simulando fill: {e}")
+            trading_logger.logger.error("❌ Error simulando fill: %s", e)
+            return None
     
-    async def _update_position(self, fill: Fill):
+    def _update_position(self, fill: Fill):
         """Actualizar posición basada en fill."""
         try:
             symbol = fill.symbol
             
-            if symbol not in self.positions:
-                self.positions[symbol] = Position(symbol=symbol)
+            position = self.positions.get(symbol)
+            if position is None:
+                position = self.positions[symbol] = Position(symbol=symbol)
             
-            position = self.positions[symbol]
-            
-            # Calcular nueva posición
-            if fill.side == OrderSide.BUY:
-                new_size = position.size + fill.quantity
-            else:
-                new_size = position.size - fill.quantity
-            
-            # Actualizar precio promedio
-            if new_size != 0:
-                if (position.size > 0 and fill.side == OrderSide.BUY) or \
-                   (position.size < 0 and fill.side == OrderSide.SELL):
-                    # Aumentar posición existente
-                    total_cost = (position.size * position.avg_price + 
-                                 fill.quantity * fill.price)
-                    position.avg_price = total_cost / new_size
-                else:
-                    # Cambiar dirección o cerrar posición
-                    if abs(new_size) < abs(position.size):
-                        # Reducir posición - mantener precio promedio
-                        pass
-                    else:
-                        # Nueva posición en dirección opuesta
-                        position.avg_price = fill.price
+            # Calcular nueva posición y precio promedio
+            sign = 1.0 if fill.side is OrderSide.BUY else -1.0
+            new_size, position.avg_price = update_position(
+                position.size, position.avg_price, sign, fill.quantity, fill.price
+            )
             
             position.size = new_size
-            position.last_update = datetime.now()
+            position.last_update_ns = time.monotonic_ns()
+            self._positions_snapshot = None
             
             # Notificar callbacks
-            await self._notify_position_callbacks(position)
+            self._spawn(self._notify_position_callbacks(position))
             
         except Exception as e:
-            trading_logger.logger.error(f"❌ Error actualizando posición: {e}")
-    
-    async def _wait_for_fill(self, order_id: str, timeout: int = 60) -> bool:
-        """Esperar a que se ejecute una orden."""
-        start_time = datetime.now()
-        
-        while (datetime.now() - start_time).seconds < timeout:
-            if order_id in self.orders:
-                order = self.orders[order_id]
-                if order.is_filled:
-                    return True
-                if order.status in [OrderStatus.CANCELLED, OrderStatus.REJECTED]:
-                    return False
-            
-            await asyncio.sleep(0.5)
-        
-        return False
+            trading_logger.logger.error("❌ Error actualizando posición: %s", e)
     
     async def _notify_order_callbacks(self, order: Order, event: str):
         """Notificar callbacks de órdenes."""
-        for callback in self.order_callbacks:
-            try:
-                await callback(order, event)
-            except Exception as e:
-                trading_logger.logger.error(f"❌ Error en callback de orden: {e}")
+        await self._dispatch_callbacks(self.order_callbacks, "orden", order, event)
     
     async def _notify_fill_callbacks(self, fill: Fill):
         """Notificar callbacks de fills."""
-        for callback in self.fill_callbacks:
-            try:
-                await callback(fill)
-            except Exception as e:
-                trading_logger.logger.error(f"❌ Error en callback de fill: {e}")
+        await self._dispatch_callbacks(self.fill_callbacks, "fill", fill)
     
     async def _notify_position_callbacks(self, position: Position):
         """Notificar callbacks de posiciones."""
-        for callback in self.position_callbacks:
-            try:
-                await callback(position)
-            except Exception as e:
-                trading_logger.logger.error(f"❌ Error en callback de posición: {e}")
+        await self._dispatch_callbacks(self.position_callbacks, "posición", position)
+    
+    async def _dispatch_callbacks(self, callbacks: List[Callable], kind: str, *args):
+        """Ejecutar callbacks concurrentemente; un suscriptor lento no bloquea al resto."""
+        if not callbacks:
+            return
+        
+        results = await asyncio.gather(
+            *(callback(*args) for callback in callbacks),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                trading_logger.logger.error("❌ Error en callback de %s: %s", kind, result)
     
     async def _load_state(self):
         """Cargar estado previo."""
@@ -710,6 +1240,8 @@ class OrderManager:
         for order in open_orders:
             await self.cancel_order(order.id)
         
+        await self._stop_processor()
+        
         # Guardar estado
         await self._save_state()
         
@@ -4,18 +4,55 @@ Simulates real trading without actual money
 """
 
 import asyncio
+import heapq
+import itertools
+import time
 import uuid
-from typing import Dict, List, Optional, Any, Union
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Any, Union, Tuple, Set
 from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_HALF_UP
 from enum import Enum
 import logging
 
+import bson
+import numpy as np
+from bson.raw_bson import RawBSONDocument
+from pymongo import UpdateOne
+
 from ...utils.database import get_mongodb_client
 from ..brokers.alpaca_broker import AlpacaBroker
 
 logger = logging.getLogger(__name__)
 
+# Fields of a stored order that the engine keeps in memory
+_PENDING_ORDER_PROJECTION = {
+    '_id': 0,
+    'order_id': 1,
+    'symbol': 1,
+    'qty': 1,
+    'side': 1,
+    'order_type': 1,
+    'limit_price': 1,
+    'stop_price': 1,
+    'status': 1,
+    'filled_qty': 1
+}
+
+# Key layout of a trade record; copied per fill instead of built from a literal
+_TRADE_TEMPLATE = {
+    'trade_id': None,
+    'order_id': None,
+    'symbol': None,
+    'side': None,
+    'qty': 0.0,
+    'price': 0.0,
+    'value': 0.0,
+    'commission': 0.0,
+    'timestamp': None,
+    'broker': 'paper'
+}
+
 class OrderStatus(Enum):
     PENDING = "pending"
     FILLED = "filled"
@@ -35,21 +72,83 @@ class OrderSide(Enum):
     BUY = "buy"
     SELL = "sell"
 
+@dataclass(slots=True)
+class Position:
+    """Paper trading position"""
+    symbol: str
+    qty: float
+    avg_price: float
+    market_value: float = 0.0
+    unrealized_pnl: float = 0.0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = field(default_factory=datetime.utcnow)
+    broker: str = 'paper'
+    status: str = 'active'
+    
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> 'Position':
+        """Build a position from a stored document"""
+        now = datetime.utcnow()
+        return cls(
+            symbol=doc['symbol'],
+            qty=doc['qty'],
+            avg_price=doc['avg_price'],
+            market_value=doc.get('market_value', 0.0),
+            unrealized_pnl=doc.get('unrealized_pnl', 0.0),
+            created_at=doc.get('created_at') or now,
+            updated_at=doc.get('updated_at') or now
+        )
+
 class PaperTradingEngine:
     """Paper trading engine that simulates real trading"""
     
     def __init__(self, initial_capital: float = 100000.0):
         self.initial_capital = initial_capital
         self.cash = initial_capital
-        self.positions = {}  # symbol -> position data
+        self.positions: Dict[str, Position] = {}
+        
+        # Column view of positions (qty / avg price) for vectorized valuation
+        self._sym_idx: Dict[str, int] = {}
+        self._pos_symbols: List[str] = []
+        self._qty_arr = np.zeros(64, dtype=np.float64)
+        self._avg_arr = np.zeros(64, dtype=np.float64)
         self.orders = {}     # order_id -> order data
-        self.trades = []     # executed trades history
+        self.trades = deque(maxlen=10_000)  # recent executed trades (full history in Mongo)
+        self._no_older_trades = False  # set once Mongo has nothing older than self.trades
         self.portfolio_value = initial_capital
         
+        # Pending orders by trigger price: (symbol, 'up'|'down') -> heap of
+        # (key, order_id). 'up' fires when price >= trigger (key = trigger),
+        # 'down' when price <= trigger (key = -trigger). Cancelled or filled
+        # orders are dropped lazily when popped.
+        self._trigger_heaps: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+        
         # Market data source (using Alpaca for real market data)
         self.market_data_source = AlpacaBroker()
         self.connected = False
         
+        # Short-lived price cache: symbol -> (monotonic ts, price)
+        self._price_cache: Dict[str, Tuple[float, float]] = {}
+        self._price_ttl = 1.0
+        
+        # Portfolio value is only recomputed when dirty or stale
+        self._portfolio_value_dirty = True
+        self._pv_ts = 0.0
+        
+        # Debounced persistence: positions changed since the last flush
+        self._dirty_symbols: Set[str] = set()
+        self._state_dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_interval = 1.0
+        
+        # Write-behind queue for new orders, inserted in batches
+        self._order_write_q: asyncio.Queue = asyncio.Queue()
+        self._order_writer_task: Optional[asyncio.Task] = None
+        self._order_write_interval = 0.01
+        
+        # Fire-and-forget trade writes (strong refs until they finish)
+        self._persist_tasks: Set[asyncio.Task] = set()
+        
         # Performance tracking
         self.total_trades = 0
         self.winning_trades = 0
@@ -58,6 +157,10 @@ class PaperTradingEngine:
         self.max_drawdown = 0.0
         self.peak_value = initial_capital
         
+        # Derived metrics, refreshed on fill / revaluation rather than on read
+        self.win_rate = 0.0
+        self.return_pct = 0.0
+        
     async def connect(self) -> bool:
         """Connect to market data source"""
         try:
@@ -68,8 +171,13 @@ class PaperTradingEngine:
                 
                 # Initialize database connection
                 db_client = await get_mongodb_client()
+                await self._ensure_indexes(db_client)
                 await self._load_state_from_db(db_client)
                 
+                # Persist state changes and new orders in the background
+                self._flush_task = asyncio.create_task(self._flush_loop())
+                self._order_writer_task = asyncio.create_task(self._order_writer_loop())
+                
             return success
         except Exception as e:
             logger.error(f"Failed to connect paper trading engine: {e}")
@@ -77,11 +185,43 @@ class PaperTradingEngine:
     
     async def disconnect(self):
         """Disconnect from market data source"""
+        for task in (self._flush_task, self._order_writer_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._flush_task = None
+        self._order_writer_task = None
+        
+        # Final flush of in-flight trades, queued orders and pending state
+        if self._persist_tasks:
+            await asyncio.gather(*self._persist_tasks, return_exceptions=True)
+        await self._write_queued_orders()
+        await self._flush_dirty()
+        
         if self.market_data_source:
             await self.market_data_source.disconnect()
         self.connected = False
         logger.info("Paper trading engine disconnected")
     
+    async def _ensure_indexes(self, db_client):
+        """Create the indexes used by paper trading queries"""
+        try:
+            results = await asyncio.gather(
+                db_client.get_collection('trades').create_index([('broker', 1), ('timestamp', -1)]),
+                db_client.get_collection('orders').create_index([('broker', 1), ('status', 1), ('created_at', -1)]),
+                db_client.get_collection('positions').create_index([('broker', 1), ('symbol', 1)], unique=True),
+                db_client.get_collection('market_data').create_index([('symbol', 1), ('timestamp', -1)]),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Error creating paper trading index: {result}")
+        except Exception as e:
+            logger.error(f"Error creating paper trading indexes: {e}")
+    
     async def _load_state_from_db(self, db_client):
         """Load paper trading state from database"""
         try:
@@ -89,16 +229,21 @@ class PaperTradingEngine:
             positions = await db_client.get_positions()
             for pos in positions:
                 if pos.get('broker') == 'paper':
-                    self.positions[pos['symbol']] = pos
+                    self.positions[pos['symbol']] = Position.from_doc(pos)
+                    self._set_position_columns(pos['symbol'], pos['qty'], pos['avg_price'])
             
             # Load pending orders
-            orders = await db_client.get_collection('orders').find({
-                'broker': 'paper',
-                'status': {'$in': ['pending', 'partially_filled']}
-            }).to_list(length=None)
+            orders = await db_client.get_collection('orders').find(
+                {
+                    'broker': 'paper',
+                    'status': {'$in': ['pending', 'partially_filled']}
+                },
+                projection=_PENDING_ORDER_PROJECTION
+            ).to_list(length=None)
             
             for order in orders:
                 self.orders[order['order_id']] = order
+                self._index_pending_order(order)
             
             # Calculate current portfolio value
             await self._update_portfolio_value()
@@ -108,15 +253,36 @@ class PaperTradingEngine:
         except Exception as e:
             logger.error(f"Error loading paper trading state: {e}")
     
-    async def _save_state_to_db(self, db_client):
-        """Save paper trading state to database"""
+    async def _flush_loop(self):
+        """Periodically persist state changed since the last flush"""
+        while self.connected:
+            await asyncio.sleep(self._flush_interval)
+            await self._flush_dirty()
+    
+    async def _flush_dirty(self):
+        """Save dirty positions and a portfolio snapshot to database"""
+        if not self._state_dirty and not self._dirty_symbols:
+            return
+        
+        symbols, self._dirty_symbols = self._dirty_symbols, set()
+        self._state_dirty = False
+        
         try:
-            # Save positions
-            for symbol, position in self.positions.items():
-                await db_client.save_position(position)
+            db_client = await get_mongodb_client()
             
-            # Save portfolio snapshot
-            await db_client.save_portfolio_snapshot({
+            # Upsert only the positions that changed; closed ones are marked as such
+            now = datetime.utcnow()
+            ops = []
+            for symbol in symbols:
+                position = self.positions.get(symbol)
+                if position is not None:
+                    update = {**asdict(position), 'updated_at': now}
+                else:
+                    update = {'qty': 0.0, 'status': 'closed', 'updated_at': now}
+                ops.append(UpdateOne({'broker': 'paper', 'symbol': symbol}, {'$set': update}, upsert=True))
+            
+            # Save positions and portfolio snapshot concurrently
+            snapshot = db_client.save_portfolio_snapshot({
                 'broker': 'paper',
                 'cash': self.cash,
                 'portfolio_value': self.portfolio_value,
@@ -125,13 +291,58 @@ class PaperTradingEngine:
                 'total_trades': self.total_trades,
                 'winning_trades': self.winning_trades,
                 'losing_trades': self.losing_trades,
-                'win_rate': self.winning_trades / max(self.total_trades, 1),
+                'win_rate': self.win_rate,
                 'max_drawdown': self.max_drawdown
             })
+            if ops:
+                await asyncio.gather(
+                    db_client.get_collection('positions').bulk_write(ops, ordered=False),
+                    snapshot
+                )
+            else:
+                await snapshot
             
+        except asyncio.CancelledError:
+            self._dirty_symbols |= symbols
+            self._state_dirty = True
+            raise
         except Exception as e:
+            self._dirty_symbols |= symbols
+            self._state_dirty = True
             logger.error(f"Error saving paper trading state: {e}")
     
+    async def _order_writer_loop(self):
+        """Insert queued orders in batches"""
+        while self.connected:
+            # Block until an order arrives; disconnect() cancels the wait
+            order = await self._order_write_q.get()
+            
+            # Let a burst accumulate, then write it in one round-trip
+            try:
+                await asyncio.sleep(self._order_write_interval)
+            except asyncio.CancelledError:
+                # Hand the order back for the final flush in disconnect()
+                self._order_write_q.put_nowait(order)
+                raise
+            await self._write_queued_orders([order])
+    
+    async def _write_queued_orders(self, batch: Optional[List[Dict[str, Any]]] = None):
+        """Drain the order write queue and insert it with insert_many"""
+        batch = batch or []
+        while not self._order_write_q.empty():
+            batch.append(self._order_write_q.get_nowait())
+        if not batch:
+            return
+        
+        try:
+            # Encode once up front; pymongo passes raw documents through untouched
+            # (and no longer writes an ObjectId back into the in-memory orders)
+            docs = [RawBSONDocument(bson.encode(order)) for order in batch]
+            db_client = await get_mongodb_client()
+            await db_client.get_collection('orders').insert_many(docs, ordered=False)
+        except Exception as e:
+            logger.error(f"Error saving {len(batch)} paper orders: {e}")
+    
     async def place_order(self,
                          symbol: str,
                          qty: Union[int, float],
@@ -149,8 +360,18 @@ class PaperTradingEngine:
         # Generate order ID
         order_id = client_order_id or str(uuid.uuid4())
         
+        # Normalize once; everything below works on these
+        symbol_u = symbol.upper()
+        side_l = side.lower()
+        type_l = order_type.lower()
+        
+        # Get current market price (shared with validation)
+        current_price = await self._get_current_price(symbol_u)
+        
         # Validate order
-        validation_result = await self._validate_order(symbol, qty, side, order_type, limit_price, stop_price)
+        validation_result = await self._validate_order(
+            symbol_u, qty, side_l, type_l, limit_price, stop_price, current_price=current_price
+        )
         if not validation_result['valid']:
             return {
                 'order_id': order_id,
@@ -158,8 +379,6 @@ class PaperTradingEngine:
                 'rejection_reason': validation_result['reason']
             }
         
-        # Get current market price
-        current_price = await self._get_current_price(symbol)
         if not current_price:
             return {
                 'order_id': order_id,
@@ -168,34 +387,35 @@ class PaperTradingEngine:
             }
         
         # Create order
+        now = datetime.utcnow()
         order = {
             'order_id': order_id,
-            'symbol': symbol.upper(),
+            'symbol': symbol_u,
             'qty': abs(float(qty)),
-            'side': side.lower(),
-            'order_type': order_type.lower(),
+            'side': side_l,
+            'order_type': type_l,
             'limit_price': limit_price,
             'stop_price': stop_price,
             'time_in_force': time_in_force,
             'status': OrderStatus.PENDING.value,
             'filled_qty': 0.0,
             'avg_fill_price': 0.0,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow(),
+            'created_at': now,
+            'updated_at': now,
             'broker': 'paper',
             'current_market_price': current_price
         }
         
         # Try to fill immediately for market orders
-        if order_type.lower() == 'market':
-            await self._fill_order(order, current_price)
+        if type_l == 'market':
+            await self._fill_order(order, current_price, now)
         else:
             # Store pending order
             self.orders[order_id] = order
+            self._index_pending_order(order)
         
-        # Save to database
-        db_client = await get_mongodb_client()
-        await db_client.get_collection('orders').insert_one(order)
+        # Save to database (write-behind, batched by _order_writer_loop)
+        self._order_write_q.put_nowait(order)
         
         logger.info(f"Paper order placed: {order_id} - {side} {qty} {symbol} @ {order_type}")
         
@@ -210,29 +430,31 @@ class PaperTradingEngine:
         }
     
     async def _validate_order(self, symbol: str, qty: float, side: str, order_type: str, 
-                             limit_price: Optional[float], stop_price: Optional[float]) -> Dict[str, Any]:
-        """Validate order parameters"""
+                             limit_price: Optional[float], stop_price: Optional[float],
+                             current_price: Optional[float] = None) -> Dict[str, Any]:
+        """Validate order parameters (symbol, side and order_type already normalized)"""
         
         # Check basic parameters
         if qty <= 0:
             return {'valid': False, 'reason': 'Quantity must be positive'}
         
-        if side.lower() not in ['buy', 'sell']:
+        if side not in ['buy', 'sell']:
             return {'valid': False, 'reason': 'Side must be buy or sell'}
         
-        if order_type.lower() not in ['market', 'limit', 'stop', 'stop_limit']:
+        if order_type not in ['market', 'limit', 'stop', 'stop_limit']:
             return {'valid': False, 'reason': 'Invalid order type'}
         
         # Check price parameters
-        if order_type.lower() in ['limit', 'stop_limit'] and not limit_price:
+        if order_type in ['limit', 'stop_limit'] and not limit_price:
             return {'valid': False, 'reason': 'Limit price required for limit orders'}
         
-        if order_type.lower() in ['stop', 'stop_limit'] and not stop_price:
+        if order_type in ['stop', 'stop_limit'] and not stop_price:
             return {'valid': False, 'reason': 'Stop price required for stop orders'}
         
         # Check buying power for buy orders
-        if side.lower() == 'buy':
-            current_price = await self._get_current_price(symbol)
+        if side == 'buy':
+            if current_price is None:
+                current_price = await self._get_current_price(symbol)
             if not current_price:
                 return {'valid': False, 'reason': f'Unable to get price for {symbol}'}
             
@@ -241,16 +463,20 @@ class PaperTradingEngine:
                 return {'valid': False, 'reason': f'Insufficient buying power. Need ${order_value:.2f}, have ${self.cash:.2f}'}
         
         # Check position for sell orders
-        elif side.lower() == 'sell':
-            position = self.positions.get(symbol.upper())
-            if not position or position['qty'] < qty:
-                available_qty = position['qty'] if position else 0
+        elif side == 'sell':
+            position = self.positions.get(symbol)
+            if not position or position.qty < qty:
+                available_qty = position.qty if position else 0
                 return {'valid': False, 'reason': f'Insufficient shares. Need {qty}, have {available_qty}'}
         
         return {'valid': True, 'reason': None}
     
     async def _get_current_price(self, symbol: str) -> Optional[float]:
         """Get current market price for symbol"""
+        cached = self._price_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < self._price_ttl:
+            return cached[1]
+        
         try:
             # Get latest market data
             market_data = await self.market_data_source.get_market_data(
@@ -260,7 +486,9 @@ class PaperTradingEngine:
             )
             
             if market_data:
-                return market_data[-1]['close']
+                price = market_data[-1]['close']
+                self._price_cache[symbol] = (time.monotonic(), price)
+                return price
             
             return None
             
@@ -268,9 +496,11 @@ class PaperTradingEngine:
             logger.error(f"Error getting current price for {symbol}: {e}")
             return None
     
-    async def _fill_order(self, order: Dict[str, Any], fill_price: float):
+    async def _fill_order(self, order: Dict[str, Any], fill_price: float, now: Optional[datetime] = None):
         """Fill an order at the specified price"""
         
+        # One timestamp for every record touched by this fill
+        now = now or datetime.utcnow()
         symbol = order['symbol']
         qty = order['qty']
         side = order['side']
@@ -280,58 +510,53 @@ class PaperTradingEngine:
         commission = self._calculate_commission(fill_value)
         
         # Update cash and positions
+        position = self.positions.get(symbol)
         if side == 'buy':
             self.cash -= (fill_value + commission)
             
             # Update position
-            if symbol in self.positions:
+            if position is not None:
                 # Add to existing position
-                current_pos = self.positions[symbol]
-                total_qty = current_pos['qty'] + qty
-                total_cost = (current_pos['qty'] * current_pos['avg_price']) + fill_value
-                avg_price = total_cost / total_qty
+                total_qty = position.qty + qty
+                avg_price = (position.qty * position.avg_price + fill_value) / total_qty
                 
-                self.positions[symbol].update({
-                    'qty': total_qty,
-                    'avg_price': avg_price,
-                    'market_value': total_qty * fill_price,
-                    'unrealized_pnl': (fill_price - avg_price) * total_qty,
-                    'updated_at': datetime.utcnow()
-                })
+                position.qty = total_qty
+                position.avg_price = avg_price
+                position.market_value = total_qty * fill_price
+                position.unrealized_pnl = (fill_price - avg_price) * total_qty
+                position.updated_at = now
+                self._set_position_columns(symbol, total_qty, avg_price)
             else:
                 # Create new position
-                self.positions[symbol] = {
-                    'symbol': symbol,
-                    'qty': qty,
-                    'avg_price': fill_price,
-                    'market_value': fill_value,
-                    'unrealized_pnl': 0.0,
-                    'created_at': datetime.utcnow(),
-                    'updated_at': datetime.utcnow(),
-                    'broker': 'paper',
-                    'status': 'active'
-                }
+                self.positions[symbol] = Position(
+                    symbol=symbol,
+                    qty=qty,
+                    avg_price=fill_price,
+                    market_value=fill_value,
+                    created_at=now,
+                    updated_at=now
+                )
+                self._set_position_columns(symbol, qty, fill_price)
         
         else:  # sell
             self.cash += (fill_value - commission)
             
             # Update position
-            if symbol in self.positions:
-                current_pos = self.positions[symbol]
-                realized_pnl = (fill_price - current_pos['avg_price']) * qty
+            if position is not None:
+                realized_pnl = (fill_price - position.avg_price) * qty
                 
-                if current_pos['qty'] == qty:
+                if position.qty == qty:
                     # Close position completely
                     del self.positions[symbol]
+                    self._remove_position_columns(symbol)
                 else:
                     # Reduce position
-                    new_qty = current_pos['qty'] - qty
-                    self.positions[symbol].update({
-                        'qty': new_qty,
-                        'market_value': new_qty * fill_price,
-                        'unrealized_pnl': (fill_price - current_pos['avg_price']) * new_qty,
-                        'updated_at': datetime.utcnow()
-                    })
+                    new_qty = position.qty - qty
+                    position.qty = new_qty
+                    position.market_value = new_qty * fill_price
+                    position.unrealized_pnl = (fill_price - position.avg_price) * new_qty
+                    position.updated_at = now
+                    self._set_position_columns(symbol, new_qty, position.avg_price)
                 
                 # Track realized PnL
                 self.total_pnl += realized_pnl
@@ -341,61 +566,122 @@ class PaperTradingEngine:
                     self.losing_trades += 1
         
         # Update order status
-        order.update({
-            'status': OrderStatus.FILLED.value,
-            'filled_qty': qty,
-            'avg_fill_price': fill_price,
-            'filled_at': datetime.utcnow(),
-            'commission': commission
-        })
+        order['status'] = OrderStatus.FILLED.value
+        order['filled_qty'] = qty
+        order['avg_fill_price'] = fill_price
+        order['filled_at'] = now
+        order['commission'] = commission
         
         # Record trade
-        trade = {
-            'trade_id': str(uuid.uuid4()),
-            'order_id': order['order_id'],
-            'symbol': symbol,
-            'side': side,
-            'qty': qty,
-            'price': fill_price,
-            'value': fill_value,
-            'commission': commission,
-            'timestamp': datetime.utcnow(),
-            'broker': 'paper'
-        }
+        trade = _TRADE_TEMPLATE.copy()
+        trade['trade_id'] = str(uuid.uuid4())
+        trade['order_id'] = order['order_id']
+        trade['symbol'] = symbol
+        trade['side'] = side
+        trade['qty'] = qty
+        trade['price'] = fill_price
+        trade['value'] = fill_value
+        trade['commission'] = commission
+        trade['timestamp'] = now
         
         self.trades.append(trade)
         self.total_trades += 1
+        self.win_rate = self.winning_trades / self.total_trades
+        self.invalidate_price(symbol)
+        self._portfolio_value_dirty = True
         
         # Update portfolio value
         await self._update_portfolio_value()
         
-        # Save to database
-        db_client = await get_mongodb_client()
-        await db_client.save_trade(trade)
-        await self._save_state_to_db(db_client)
+        # State is persisted by the background flush
+        self._dirty_symbols.add(symbol)
+        self._state_dirty = True
+        
+        # Trade write happens off the fill path
+        task = asyncio.create_task(self._persist_fill(trade))
+        self._persist_tasks.add(task)
+        task.add_done_callback(self._persist_tasks.discard)
         
         logger.info(f"Order filled: {order['order_id']} - {side} {qty} {symbol} @ ${fill_price:.2f}")
     
+    async def _persist_fill(self, trade: Dict[str, Any]):
+        """Save a trade record in the background"""
+        try:
+            db_client = await get_mongodb_client()
+            await db_client.save_trade(trade)
+        except Exception as e:
+            logger.error(f"Error saving paper trade {trade['trade_id']}: {e}")
+    
+    async def _get_current_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Get current prices for several symbols with one multi-symbol request"""
+        now = time.monotonic()
+        prices: Dict[str, float] = {}
+        missing = []
+        for symbol in symbols:
+            cached = self._price_cache.get(symbol)
+            if cached and now - cached[0] < self._price_ttl:
+                prices[symbol] = cached[1]
+            else:
+                missing.append(symbol)
+        
+        if missing:
+            try:
+                latest = await self.market_data_source.get_latest_prices(missing)
+            except Exception as e:
+                logger.error(f"Error getting current prices for {missing}: {e}")
+                return prices
+            
+            now = time.monotonic()
+            for symbol, price in latest.items():
+                self._price_cache[symbol] = (now, price)
+            prices.update(latest)
+        
+        return prices
+    
+    def invalidate_price(self, symbol: str):
+        """Drop the cached price for symbol"""
+        self._price_cache.pop(symbol, None)
+    
     def _calculate_commission(self, trade_value: float) -> float:
         """Calculate commission for trade (Alpaca is commission-free)"""
         return 0.0  # Alpaca doesn't charge commissions
     
-    async def _update_portfolio_value(self):
+    async def _update_portfolio_value(self) -> float:
         """Update total portfolio value"""
-        total_value = self.cash
-        
-        # Add market value of all positions
-        for symbol, position in self.positions.items():
-            current_price = await self._get_current_price(symbol)
-            if current_price:
-                market_value = position['qty'] * current_price
-                total_value += market_value
-                
-                # Update position market value and unrealized PnL
-                position['market_value'] = market_value
-                position['unrealized_pnl'] = (current_price - position['avg_price']) * position['qty']
+        if not self._portfolio_value_dirty and time.monotonic() - self._pv_ts < self._price_ttl:
+            return self.portfolio_value
+        
+        # Fetch all position prices in one request, then value as arrays
+        prices = await self._get_current_prices(list(self._pos_symbols))
+        
+        # Positions the feed could not price fall back to their last stored
+        # close (valued below with the in-memory quantity) instead of
+        # dropping out of the total
+        unpriced = [symbol for symbol in self._pos_symbols if not prices.get(symbol)]
+        if unpriced:
+            prices.update(await self._stored_closes(unpriced))
+        
+        n = len(self._pos_symbols)
+        price_arr = np.fromiter(
+            (prices.get(symbol) or np.nan for symbol in self._pos_symbols),
+            dtype=np.float64,
+            count=n
+        )
+        priced = ~np.isnan(price_arr)
+        
+        qty_arr = self._qty_arr[:n]
+        market_values = qty_arr * price_arr
+        unrealized = (price_arr - self._avg_arr[:n]) * qty_arr
+        total_value = self.cash + float(market_values[priced].sum())
+        
+        # Update position market value and unrealized PnL
+        for i in np.flatnonzero(priced).tolist():
+            position = self.positions[self._pos_symbols[i]]
+            position.market_value = float(market_values[i])
+            position.unrealized_pnl = float(unrealized[i])
         
         self.portfolio_value = total_value
+        self.return_pct = (total_value - self.initial_capital) / self.initial_capital * 100
         
         # Update max drawdown
         if total_value > self.peak_value:
@@ -404,6 +690,48 @@ class PaperTradingEngine:
         current_drawdown = (self.peak_value - total_value) / self.peak_value
         if current_drawdown > self.max_drawdown:
             self.max_drawdown = current_drawdown
+        
+        self._portfolio_value_dirty = False
+        self._pv_ts = time.monotonic()
+        return total_value
+    
+    async def _stored_closes(self, symbols: List[str]) -> Dict[str, float]:
+        """Latest stored close per symbol from one aggregation round-trip"""
+        try:
+            db_client = await get_mongodb_client()
+            return await db_client.get_latest_closes(symbols)
+        except Exception as e:
+            logger.error(f"Error getting stored closes for {symbols}: {e}")
+            return {}
+    
+    def _set_position_columns(self, symbol: str, qty: float, avg_price: float):
+        """Insert or update a position in the column view"""
+        i = self._sym_idx.get(symbol)
+        if i is None:
+            i = len(self._pos_symbols)
+            if i == len(self._qty_arr):
+                self._qty_arr = np.concatenate([self._qty_arr, np.zeros(i)])
+                self._avg_arr = np.concatenate([self._avg_arr, np.zeros(i)])
+            self._sym_idx[symbol] = i
+            self._pos_symbols.append(symbol)
+        
+        self._qty_arr[i] = qty
+        self._avg_arr[i] = avg_price
+    
+    def _remove_position_columns(self, symbol: str):
+        """Remove a position from the column view (swap with last)"""
+        i = self._sym_idx.pop(symbol, None)
+        if i is None:
+            return
+        
+        last = len(self._pos_symbols) - 1
+        if i != last:
+            moved = self._pos_symbols[last]
+            self._pos_symbols[i] = moved
+            self._qty_arr[i] = self._qty_arr[last]
+            self._avg_arr[i] = self._avg_arr[last]
+            self._sym_idx[moved] = i
+        self._pos_symbols.pop()
     
     async def cancel_order(self, order_id: str) -> bool:
         """Cancel a pending order"""
@@ -422,8 +750,10 @@ class PaperTradingEngine:
         
         # Remove from pending orders
         del self.orders[order_id]
+        self._portfolio_value_dirty = True
         
-        # Update in database
+        # Update in database; if the insert is still queued it carries
+        # the cancelled state itself since the queue holds this same dict
         db_client = await get_mongodb_client()
         await db_client.get_collection('orders').update_one(
             {'order_id': order_id},
@@ -449,16 +779,16 @@ class PaperTradingEngine:
             'total_trades': self.total_trades,
             'winning_trades': self.winning_trades,
             'losing_trades': self.losing_trades,
-            'win_rate': self.winning_trades / max(self.total_trades, 1),
+            'win_rate': self.win_rate,
             'max_drawdown': self.max_drawdown,
             'initial_capital': self.initial_capital,
-            'return_pct': ((self.portfolio_value - self.initial_capital) / self.initial_capital) * 100
+            'return_pct': self.return_pct
         }
     
     async def get_positions(self) -> List[Dict[str, Any]]:
         """Get current positions"""
         await self._update_portfolio_value()
-        return list(self.positions.values())
+        return [asdict(position) for position in self.positions.values()]
     
     async def get_orders(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get orders"""
@@ -471,14 +801,45 @@ class PaperTradingEngine:
     
     async def get_trades(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get trade history"""
-        return self.trades[-limit:] if limit else self.trades
+        if not limit:
+            return list(self.trades)
+        
+        # Once Mongo is known to hold nothing older than the deque, the deque
+        # is the whole history until it starts evicting
+        recent = len(self.trades)
+        if limit <= recent or (self._no_older_trades and recent < self.trades.maxlen):
+            return list(itertools.islice(self.trades, max(recent - limit, 0), None))
+        
+        # Only the trades older than the deque come from Mongo; the deque
+        # covers fills whose background write has not landed yet
+        query: Dict[str, Any] = {'broker': 'paper'}
+        if recent:
+            query['timestamp'] = {'$lte': self.trades[0]['timestamp']}
+        try:
+            db_client = await get_mongodb_client()
+            cursor = db_client.get_collection('trades').find(
+                query,
+                projection={'_id': 0}
+            ).sort('timestamp', -1).limit(limit)
+            older = await cursor.to_list(length=limit)
+        except Exception as e:
+            logger.error(f"Error loading trade history: {e}")
+            return list(self.trades)
+        
+        in_memory = {trade['trade_id'] for trade in self.trades}
+        older = [trade for trade in older if trade.get('trade_id') not in in_memory]
+        if len(older) < limit - recent:
+            self._no_older_trades = True
+        older.reverse()
+        older = older[max(len(older) - (limit - recent), 0):]
+        return older + list(self.trades)
     
     async def get_performance_metrics(self) -> Dict[str, Any]:
         """Get performance metrics"""
         await self._update_portfolio_value()
         
         total_return = self.portfolio_value - self.initial_capital
-        return_pct = (total_return / self.initial_capital) * 100
+        return_pct = self.return_pct
         
         # Calculate Sharpe ratio (simplified)
         # TODO: Implement proper Sharpe ratio calculation with daily returns
@@ -490,7 +851,7 @@ class PaperTradingEngine:
             'total_trades': self.total_trades,
             'winning_trades': self.winning_trades,
             'losing_trades': self.losing_trades,
-            'win_rate': self.winning_trades / max(self.total_trades, 1),
+            'win_rate': self.win_rate,
             'profit_factor': abs(self.total_pnl) / max(abs(self.total_pnl - total_return), 1),
             'max_drawdown': self.max_drawdown,
             'sharpe_ratio': sharpe_ratio,
@@ -499,66 +860,103 @@ class PaperTradingEngine:
             'positions_value': self.portfolio_value - self.cash
         }
     
+    def _index_pending_order(self, order: Dict[str, Any]):
+        """Push a pending order onto the heap for its trigger price"""
+        if order['status'] != OrderStatus.PENDING.value:
+            return
+        
+        side = order['side']
+        order_type = order['order_type']
+        if order_type == 'limit':
+            trigger = order['limit_price']
+            direction = 'down' if side == 'buy' else 'up'
+        elif order_type in ('stop', 'stop_limit'):
+            trigger = order['stop_price']
+            direction = 'up' if side == 'buy' else 'down'
+        else:
+            return
+        
+        if trigger is None:
+            return
+        
+        key = trigger if direction == 'up' else -trigger
+        heap = self._trigger_heaps.setdefault((order['symbol'], direction), [])
+        heapq.heappush(heap, (key, order['order_id']))
+    
     async def process_pending_orders(self):
         """Process pending orders (check for fills)"""
-        if not self.orders:
+        if not self._trigger_heaps:
             return
         
-        filled_orders = []
+        to_fill = []
         
-        for order_id, order in self.orders.items():
-            if order['status'] != OrderStatus.PENDING.value:
-                continue
-            
-            symbol = order['symbol']
-            current_price = await self._get_current_price(symbol)
-            
+        # Fetch prices for every pending symbol once per cycle
+        symbols = list({symbol for symbol, _ in self._trigger_heaps})
+        prices = await self._get_current_prices(symbols)
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            fetched = await asyncio.gather(*(self._get_current_price(symbol) for symbol in missing))
+            prices.update({symbol: price for symbol, price in zip(missing, fetched) if price})
+        
+        # Matching is synchronous; only orders whose trigger was crossed are popped
+        requeue = []
+        for (symbol, direction), heap in list(self._trigger_heaps.items()):
+            current_price = prices.get(symbol)
             if not current_price:
                 continue
             
-            should_fill = False
-            fill_price = current_price
-            
-            # Check fill conditions based on order type
-            if order['order_type'] == 'limit':
-                if order['side'] == 'buy' and current_price <= order['limit_price']:
-                    should_fill = True
-                    fill_price = order['limit_price']
-                elif order['side'] == 'sell' and current_price >= order['limit_price']:
-                    should_fill = True
-                    fill_price = order['limit_price']
-            
-            elif order['order_type'] == 'stop':
-                if order['side'] == 'buy' and current_price >= order['stop_price']:
-                    should_fill = True
-                elif order['side'] == 'sell' and current_price <= order['stop_price']:
-                    should_fill = True
-            
-            elif order['order_type'] == 'stop_limit':
-                # Stop triggered, now check limit
-                if order['side'] == 'buy' and current_price >= order['stop_price']:
-                    if current_price <= order['limit_price']:
-                        should_fill = True
-                        fill_price = order['limit_price']
-                elif order['side'] == 'sell' and current_price <= order['stop_price']:
-                    if current_price >= order['limit_price']:
-                        should_fill = True
-                        fill_price = order['limit_price']
+            key = current_price if direction == 'up' else -current_price
+            while heap and heap[0][0] <= key:
+                _, order_id = heapq.heappop(heap)
+                order = self.orders.get(order_id)
+                if order is None or order['status'] != OrderStatus.PENDING.value:
+                    continue
+                
+                side = order['side']
+                order_type = order['order_type']
+                limit_price = order['limit_price']
+                fill_price = current_price
+                
+                if order_type == 'limit':
+                    fill_price = limit_price
+                
+                elif order_type == 'stop_limit':
+                    # Stop triggered, now check limit
+                    if (side == 'buy' and current_price > limit_price) or \
+                       (side == 'sell' and current_price < limit_price):
+                        requeue.append(order)
+                        continue
+                    fill_price = limit_price
+                
+                to_fill.append((order_id, order, fill_price))
             
-            if should_fill:
-                await self._fill_order(order, fill_price)
-                filled_orders.append(order_id)
-        
-        # Remove filled orders from pending
-        for order_id in filled_orders:
-            if order_id in self.orders:
-                del self.orders[order_id]
+            if not heap:
+                del self._trigger_heaps[(symbol, direction)]
+        
+        # Triggered stop-limits whose limit is not reachable yet stay pending
+        for order in requeue:
+            self._index_pending_order(order)
+        
+        if not to_fill:
+            return
+        
+        now = datetime.utcnow()
+        try:
+            await asyncio.gather(*(self._fill_order(order, fill_price, now) for _, order, fill_price in to_fill))
+        finally:
+            # Remove filled orders from pending; anything that failed goes back on its heap
+            for order_id, order, _ in to_fill:
+                if order['status'] == OrderStatus.FILLED.value:
+                    self.orders.pop(order_id, None)
+                else:
+                    self._index_pending_order(order)
     
     async def start_order_processing(self, interval: int = 60):
         """Start background order processing"""
         while self.connected:
             try:
                 await self.process_pending_orders()
+                self._portfolio_value_dirty = True
                 await asyncio.sleep(interval)
             except Exception as e:
                 logger.error(f"Error in order processing: {e}")
@@ -566,9 +964,13 @@ class PaperTradingEngine:
 
 # Global paper trading engine instance
 paper_trading_engine = PaperTradingEngine()
+_engine_lock = asyncio.Lock()
 
 async def get_paper_trading_engine() -> PaperTradingEngine:
     """Get paper trading engine instance"""
     if not paper_trading_engine.connected:
-        await paper_trading_engine.connect()
+        # Only one caller connects; the rest wait and reuse the connection
+        async with _engine_lock:
+            if not paper_trading_engine.connected:
+                await paper_trading_engine.connect()
     return paper_trading_engine
\ No newline at end of file
@@ -5,30 +5,48 @@
 
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Imports del logger a reemplazar (compilado una sola vez)
+OLD_IMPORT = re.compile(rb'from utils\.logging\.logger import ([^\n]+)')
+MARKER = b'utils.logging.logger'
+
+# Import seguro con fallback
+NEW_IMPORT = b'''# Importar logger con fallback
+try:
+    from utils.logging.logger import \\1
+except ImportError:
+    from utils.logging.simple_logger import \\1'''
+
+# Directorios que no se recorren (además de los ocultos)
+SKIP_DIRS = {'__pycache__', 'node_modules', 'venv'}
+
+def iter_python_files(root):
+    """Recorrer el árbol con os.scandir y devolver las rutas de los .py."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith('.') and entry.name not in SKIP_DIRS:
+                    yield from iter_python_files(entry.path)
+            elif entry.name.endswith('.py'):
+                yield entry.path
+
 def fix_logger_imports(file_path):
     """Arreglar imports del logger en un archivo."""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with open(file_path, 'rb') as f:
             content = f.read()
         
-        # Buscar imports del logger
-        old_import = r'from utils\.logging\.logger import ([^\n]+)'
+        # Descartar rápido los archivos que no mencionan el logger
+        if MARKER not in content:
+            return False
         
-        if re.search(old_import, content):
+        content, count = OLD_IMPORT.subn(NEW_IMPORT, content)
+        if count:
             print(f"🔧 Arreglando {file_path}")
             
-            # Reemplazar con import seguro
-            new_import = '''# Importar logger con fallback
-try:
-    from utils.logging.logger import \\1
-except ImportError:
-    from utils.logging.simple_logger import \\1'''
-            
-            content = re.sub(old_import, new_import, content)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with open(file_path, 'wb') as f:
                 f.write(content)
             
             return True
@@ -42,20 +60,9 @@ def main():
     """Procesar todos los archivos Python."""
     print("🔧 Arreglando imports del logger...")
     
-    # Buscar todos los archivos Python
-    python_files = []
-    for root, dirs, files in os.walk('.'):
-        # Ignorar directorios específicos
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['__pycache__', 'node_modules', 'venv']]
-        
-        for file in files:
-            if file.endswith('.py'):
-                python_files.append(os.path.join(root, file))
-    
-    fixed_count = 0
-    for file_path in python_files:
-        if fix_logger_imports(file_path):
-            fixed_count += 1
+    # Buscar todos los archivos Python y procesarlos en paralelo
+    with ProcessPoolExecutor() as executor:
+        fixed_count = sum(executor.map(fix_logger_imports, iter_python_files('.'), chunksize=64))
     
     print(f"✅ Arreglados {fixed_count} archivos")
     print("🎉 Ahora puedes ejecutar: python3 main.py")
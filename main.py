@@ -10,33 +10,157 @@ Version: 2.0.0
 """
 
 import asyncio
+import importlib
 import logging
 import os
-import signal
-import subprocess
+import shutil
 import sys
-import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
-import uvicorn
 
-# Setup basic logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Setup basic logging: una línea JSON por registro si orjson está disponible
+try:
+    import orjson
+    
+    class _JSONFormatter(logging.Formatter):
+        """Serializar cada registro como JSON con orjson."""
+        
+        def format(self, record):
+            payload = {
+                "ts": record.created,
+                "lvl": record.levelname,
+                "name": record.name,
+                "msg": record.getMessage()
+            }
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return orjson.dumps(payload).decode()
+    
+    _log_formatter = _JSONFormatter()
+except ImportError:
+    _log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+_log_handler = logging.StreamHandler(sys.stderr)
+_log_handler.setFormatter(_log_formatter)
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
 logger = logging.getLogger(__name__)
 
-# Import our components
-try:
-    from utils.database import get_mongodb_client
-    from execution.paper_trading.paper_trading_engine import get_paper_trading_engine
-    from risk_management.risk_manager import get_risk_manager
-    from agents.trading_agent.trading_agent import create_trading_agent
-    from execution.brokers.alpaca_broker import AlpacaBroker
-except ImportError as e:
-    logger.error(f"Error importing components: {e}")
-    sys.exit(1)
+# Rutas del proyecto (resueltas una vez al cargar el módulo)
+_BASE_DIR = Path(__file__).resolve().parent
+_FRONTEND = _BASE_DIR / "frontend"
+_DASHBOARD = _BASE_DIR / "dashboard" / "streamlit_app" / "main.py"
+
+# Textos de consola, escritos de una sola vez (AI_TRADING_QUIET=1 los omite)
+_RULE = "=" * 80
+BANNER = "\n".join([
+    _RULE,
+    "🤖 AI TRADING SYSTEM v2.0",
+    _RULE,
+    "Sistema de trading avanzado con agentes IA",
+    "Modo: {trading_mode}",
+    "Exchange: {exchange}",
+    "Símbolo: {symbol}",
+    "Entorno: {environment}",
+    _RULE,
+    "Características:",
+    "• Análisis técnico automatizado",
+    "• Agentes IA autónomos con LangChain",
+    "• Gestión de riesgo inteligente",
+    "• Dashboard React + FastAPI",
+    "• Machine Learning (Random Forest, LSTM)",
+    "• Paper Trading con Alpaca",
+    "• MongoDB para persistencia",
+    _RULE,
+    "⚠️  ADVERTENCIA: Siempre usa paper trading primero",
+    _RULE,
+    ""
+])
+ACCESS_URLS = "\n".join([
+    "",
+    _RULE,
+    "🌐 URLS DE ACCESO",
+    _RULE,
+    "📊 Dashboard React:    http://localhost:3000",
+    "🚀 API FastAPI:        http://{api_host}:{api_port}",
+    "📈 API Docs:           http://{api_host}:{api_port}/docs",
+    "📋 Dashboard Streamlit: http://{dashboard_host}:{dashboard_port}",
+    _RULE,
+    "💡 Usa Ctrl+C para detener el sistema",
+    _RULE,
+    "",
+    ""
+])
+
+# Componentes pesados (motor, Alpaca, LangChain...) se importan al usarse
+_LAZY_IMPORTS = {
+    'get_mongodb_client': 'utils.database',
+    'get_paper_trading_engine': 'execution.paper_trading.paper_trading_engine',
+    'get_risk_manager': 'risk_management.risk_manager',
+    'get_trading_agent': 'agents.trading_agent.trading_agent',
+    'AlpacaBroker': 'execution.brokers.alpaca_broker',
+}
+
+
+def __getattr__(name):
+    """Importar un componente la primera vez que se accede a él."""
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+# EAGER_IMPORT=1 (CI) importa todo al arrancar para detectar imports rotos
+if os.getenv('EAGER_IMPORT') == '1':
+    try:
+        for _name in _LAZY_IMPORTS:
+            __getattr__(_name)
+    except ImportError as e:
+        logger.error("Error importing components: %s", e)
+        sys.exit(1)
+
+
+def _parse_bool(value: Optional[str], default: bool = False) -> bool:
+    """Interpretar una variable de entorno como booleano."""
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Configuración del entorno, leída una sola vez al arrancar."""
+    api_host: str
+    api_port: int
+    dashboard_host: str
+    dashboard_port: int
+    debug: bool
+    trading_mode: str
+    agent_enabled: bool
+    quiet: bool
+    api_only: bool
+    
+    @property
+    def uvicorn_log_level(self) -> str:
+        """Nivel de log de uvicorn según DEBUG."""
+        return "debug" if self.debug else "info"
+    
+    @classmethod
+    def from_env(cls) -> 'Config':
+        """Construir la configuración a partir de las variables de entorno."""
+        return cls(
+            api_host=os.getenv('API_HOST', '0.0.0.0'),
+            api_port=int(os.getenv('API_PORT', '8000')),
+            dashboard_host=os.getenv('DASHBOARD_HOST', '0.0.0.0'),
+            dashboard_port=int(os.getenv('DASHBOARD_PORT', '8501')),
+            debug=_parse_bool(os.getenv('DEBUG'), default=True),
+            trading_mode=os.getenv('TRADING_MODE', 'paper'),
+            agent_enabled=_parse_bool(os.getenv('TRADING_AGENT_ENABLED')),
+            quiet=_parse_bool(os.getenv('AI_TRADING_QUIET')),
+            api_only=_parse_bool(os.getenv('AI_TRADING_API_ONLY'))
+        )
 
 
 class AITradingSystem:
@@ -45,62 +169,92 @@ class AITradingSystem:
     def __init__(self):
         """Inicializar el sistema de trading."""
         self.logger = logger
+        self.cfg = Config.from_env()
         self.db_client = None
         self.paper_engine = None
         self.risk_manager = None
         self.trading_agent = None
         self.alpaca_broker = None
-        self.api_process = None
+        self.api_server = None
+        self.api_task = None
         self.frontend_process = None
         self.streamlit_process = None
         self.is_running = False
+        self._stop: Optional[asyncio.Event] = None
         
     async def initialize(self):
         """Inicializar todos los componentes del sistema."""
         self.logger.info("🚀 Inicializando AI Trading System v2.0...")
         
         try:
-            # 1. Inicializar base de datos
-            self.logger.info("📊 Conectando a MongoDB...")
-            self.db_client = await get_mongodb_client()
+            # 1-4. MongoDB, Alpaca, paper trading y risk manager son
+            # independientes: se conectan en paralelo
+            self.logger.info("📊 Conectando MongoDB, Alpaca, paper trading y risk manager...")
+            from utils.database import get_mongodb_client
+            from execution.paper_trading.paper_trading_engine import get_paper_trading_engine
+            from risk_management.risk_manager import get_risk_manager
+            
+            db_client, broker_connected, paper_engine, risk_manager = await asyncio.gather(
+                get_mongodb_client(),
+                self._connect_alpaca(),
+                get_paper_trading_engine(),
+                get_risk_manager(),
+                return_exceptions=True
+            )
+            
+            failed = False
+            for name, result in (("MongoDB", db_client), ("Paper trading engine", paper_engine),
+                                 ("Risk manager", risk_manager)):
+                if isinstance(result, Exception):
+                    self.logger.error("❌ Error inicializando %s: %s", name, result)
+                    failed = True
+            if failed:
+                return False
+            
+            self.db_client = db_client
+            self.paper_engine = paper_engine
+            self.risk_manager = risk_manager
             self.logger.info("✅ MongoDB conectado")
+            self.logger.info("✅ Paper trading engine inicializado")
             
-            # 2. Inicializar broker de Alpaca
-            self.logger.info("🏦 Inicializando broker Alpaca...")
-            self.alpaca_broker = AlpacaBroker()
-            broker_connected = await self.alpaca_broker.connect()
+            if isinstance(broker_connected, Exception):
+                self.logger.error("❌ Error conectando a Alpaca: %s", broker_connected)
+                broker_connected = False
             if broker_connected:
                 self.logger.info("✅ Alpaca broker conectado")
             else:
                 self.logger.warning("⚠️ No se pudo conectar a Alpaca - continuando con paper trading")
             
-            # 3. Inicializar paper trading engine
-            self.logger.info("📈 Inicializando paper trading engine...")
-            self.paper_engine = await get_paper_trading_engine()
-            self.logger.info("✅ Paper trading engine inicializado")
+            # Obtener información de cuenta para inicializar risk manager:
+            # todas las fuentes a la vez, con preferencia por Alpaca
+            sources = [("Paper trading", self.paper_engine)]
+            if broker_connected:
+                sources.insert(0, ("Alpaca", self.alpaca_broker))
             
-            # 4. Inicializar risk manager
-            self.logger.info("🛡️ Inicializando risk manager...")
-            self.risk_manager = await get_risk_manager()
+            results = await asyncio.gather(
+                *(call for _, source in sources
+                  for call in (source.get_account_info(), source.get_positions())),
+                return_exceptions=True
+            )
             
-            # Obtener información de cuenta para inicializar risk manager
-            if broker_connected:
-                account_info = await self.alpaca_broker.get_account_info()
-                positions = await self.alpaca_broker.get_positions()
-                await self.risk_manager.initialize(
-                    portfolio_value=account_info['portfolio_value'],
-                    cash=account_info['cash'],
-                    positions=positions
-                )
-            else:
-                # Usar paper trading data
-                paper_account = await self.paper_engine.get_account_info()
-                paper_positions = await self.paper_engine.get_positions()
-                await self.risk_manager.initialize(
-                    portfolio_value=paper_account['portfolio_value'],
-                    cash=paper_account['cash'],
-                    positions=paper_positions
-                )
+            account_info = positions = None
+            for i, (name, _) in enumerate(sources):
+                source_account, source_positions = results[2 * i], results[2 * i + 1]
+                errors = [r for r in (source_account, source_positions) if isinstance(r, Exception)]
+                for error in errors:
+                    self.logger.error("❌ Error obteniendo cuenta de %s: %s", name, error)
+                if not errors and account_info is None:
+                    account_info, positions = source_account, source_positions
+            
+            if account_info is None:
+                self.logger.error("❌ No se pudo obtener información de cuenta")
+                return False
+            
+            await self.risk_manager.initialize(
+                portfolio_value=account_info['portfolio_value'],
+                cash=account_info['cash'],
+                positions=positions
+            )
             
             self.logger.info("✅ Risk manager inicializado")
             
@@ -108,7 +262,8 @@ class AITradingSystem:
             openai_key = os.getenv('OPENAI_API_KEY')
             if openai_key:
                 self.logger.info("🤖 Inicializando agente de trading IA...")
-                self.trading_agent = await create_trading_agent(openai_api_key=openai_key)
+                from agents.trading_agent.trading_agent import get_trading_agent
+                self.trading_agent = await get_trading_agent(openai_key)
                 self.logger.info("✅ Agente de trading IA inicializado")
             else:
                 self.logger.warning("⚠️ No se encontró OPENAI_API_KEY - agente IA deshabilitado")
@@ -117,100 +272,172 @@ class AITradingSystem:
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Error inicializando sistema: {e}")
+            self.logger.error("❌ Error inicializando sistema: %s", e)
             return False
     
-    def start_api_server(self):
-        """Iniciar servidor FastAPI."""
+    async def _connect_alpaca(self) -> bool:
+        """Crear el broker de Alpaca y conectarlo."""
+        from execution.brokers.alpaca_broker import AlpacaBroker
+        self.alpaca_broker = AlpacaBroker()
+        return await self.alpaca_broker.connect()
+    
+    async def start_api_server(self):
+        """Iniciar servidor FastAPI dentro del propio proceso."""
         try:
+            import uvicorn
+            
             self.logger.info("🌐 Iniciando servidor FastAPI...")
-            api_host = os.getenv('API_HOST', '0.0.0.0')
-            api_port = int(os.getenv('API_PORT', '8000'))
-            debug = os.getenv('DEBUG', 'true').lower() == 'true'
+            api_host = self.cfg.api_host
+            api_port = self.cfg.api_port
+            
+            config = uvicorn.Config(
+                "api.main:app", host=api_host, port=api_port,
+                log_level=self.cfg.uvicorn_log_level
+            )
+            self.api_server = uvicorn.Server(config)
+            # Las señales las gestiona run() (evento _stop) y cleanup() pide a
+            # uvicorn que salga; sin esto uvicorn reemplazaría esos handlers
+            self.api_server.install_signal_handlers = lambda: None
+            self.api_task = asyncio.create_task(self._serve_api())
             
-            self.api_process = subprocess.Popen([
-                sys.executable, "-m", "uvicorn", 
-                "api.main:app",
-                "--host", api_host,
-                "--port", str(api_port),
-                "--reload" if debug else "--no-reload"
-            ])
-            self.logger.info(f"✅ API iniciada en http://{api_host}:{api_port}")
+            # Esperar a que uvicorn esté escuchando
+            while not self.api_server.started and not self.api_task.done():
+                await asyncio.sleep(0.025)
+            
+            if self.api_server.started:
+                self.logger.info("✅ API iniciada en http://%s:%s", api_host, api_port)
+            else:
+                self.logger.error("❌ El servidor FastAPI se detuvo al arrancar")
         except Exception as e:
-            self.logger.error(f"❌ Error iniciando API: {e}")
+            self.logger.error("❌ Error iniciando API: %s", e)
+    
+    async def _serve_api(self):
+        """Ejecutar uvicorn sin que un fallo de la API detenga el trading."""
+        try:
+            await self.api_server.serve()
+        except SystemExit as e:
+            # uvicorn llama a sys.exit() si no puede cargar la app o abrir
+            # el puerto; el resto del sistema sigue funcionando
+            self.logger.error("❌ El servidor FastAPI terminó (código %s)", e.code)
     
-    def start_frontend_server(self):
+    async def start_frontend_server(self):
         """Iniciar servidor React."""
         try:
-            frontend_path = Path(__file__).parent / "frontend"
+            frontend_path = _FRONTEND
             if frontend_path.exists():
                 self.logger.info("⚛️ Iniciando frontend React...")
                 
-                # Verificar si npm está disponible
-                try:
-                    subprocess.run(["npm", "--version"], check=True, capture_output=True)
-                    
-                    # Instalar dependencias si es necesario
-                    if not (frontend_path / "node_modules").exists():
-                        self.logger.info("📦 Instalando dependencias...")
-                        subprocess.run(["npm", "install"], cwd=frontend_path, check=True)
-                    
-                    # Iniciar servidor
-                    self.frontend_process = subprocess.Popen([
-                        "npm", "run", "dev"
-                    ], cwd=frontend_path)
-                    
-                    self.logger.info("✅ Frontend iniciado en http://localhost:3000")
-                except subprocess.CalledProcessError:
+                # Verificar si npm está disponible (búsqueda en PATH, sin lanzar node)
+                npm_path = shutil.which("npm")
+                if not npm_path:
                     self.logger.warning("⚠️ npm no disponible, saltando frontend React")
+                    return
+                
+                # Instalar dependencias si faltan o el lockfile es más nuevo
+                if self._frontend_needs_install(frontend_path):
+                    self.logger.info("📦 Instalando dependencias...")
+                    install = await asyncio.create_subprocess_exec(npm_path, "install", cwd=frontend_path)
+                    if await install.wait() != 0:
+                        self.logger.warning("⚠️ Falló npm install, saltando frontend React")
+                        return
+                    (frontend_path / "node_modules" / ".install-stamp").touch()
+                
+                # Iniciar servidor
+                self.frontend_process = await asyncio.create_subprocess_exec(
+                    npm_path, "run", "dev", cwd=frontend_path
+                )
+                
+                self.logger.info("✅ Frontend iniciado en http://localhost:3000")
             else:
                 self.logger.warning("⚠️ Directorio frontend no encontrado")
         except Exception as e:
-            self.logger.error(f"❌ Error iniciando frontend: {e}")
+            self.logger.error("❌ Error iniciando frontend: %s", e)
     
-    def start_streamlit_dashboard(self):
+    @staticmethod
+    def _frontend_needs_install(frontend_path: Path) -> bool:
+        """Comprobar si hay que ejecutar npm install."""
+        node_modules = frontend_path / "node_modules"
+        if not node_modules.exists():
+            return True
+        
+        lockfile = frontend_path / "package-lock.json"
+        if not lockfile.exists():
+            return False
+        
+        # Instalaciones previas sin marca se comparan con node_modules
+        stamp = node_modules / ".install-stamp"
+        installed_at = (stamp if stamp.exists() else node_modules).stat().st_mtime
+        return lockfile.stat().st_mtime > installed_at
+    
+    async def start_streamlit_dashboard(self):
         """Iniciar dashboard Streamlit."""
         try:
             self.logger.info("📊 Iniciando dashboard Streamlit...")
-            dashboard_path = Path(__file__).parent / "dashboard" / "streamlit_app" / "main.py"
-            dashboard_host = os.getenv('DASHBOARD_HOST', '0.0.0.0')
-            dashboard_port = int(os.getenv('DASHBOARD_PORT', '8501'))
+            dashboard_path = _DASHBOARD
+            dashboard_host = self.cfg.dashboard_host
+            dashboard_port = self.cfg.dashboard_port
             
             if dashboard_path.exists():
-                self.streamlit_process = subprocess.Popen([
+                self.streamlit_process = await asyncio.create_subprocess_exec(
                     sys.executable, "-m", "streamlit", "run",
                     str(dashboard_path),
                     "--server.port", str(dashboard_port),
                     "--server.address", dashboard_host,
                     "--server.headless", "true"
-                ])
-                self.logger.info(f"✅ Streamlit iniciado en http://{dashboard_host}:{dashboard_port}")
+                )
+                self.logger.info("✅ Streamlit iniciado en http://%s:%s", dashboard_host, dashboard_port)
             else:
                 self.logger.warning("⚠️ Dashboard Streamlit no encontrado")
         except Exception as e:
-            self.logger.error(f"❌ Error iniciando Streamlit: {e}")
+            self.logger.error("❌ Error iniciando Streamlit: %s", e)
+    
+    async def _wait_port(self, host: str, port: int, timeout: float = 10.0) -> bool:
+        """Esperar a que un puerto TCP acepte conexiones."""
+        if host == '0.0.0.0':
+            host = '127.0.0.1'
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port),
+                    timeout=max(deadline - loop.time(), 0.025)
+                )
+                writer.close()
+                return True
+            except (OSError, asyncio.TimeoutError):
+                if loop.time() >= deadline:
+                    return False
+                await asyncio.sleep(0.025)
     
     def show_access_urls(self):
         """Mostrar URLs de acceso."""
-        api_host = os.getenv('API_HOST', '0.0.0.0')
-        api_port = os.getenv('API_PORT', '8000')
-        dashboard_host = os.getenv('DASHBOARD_HOST', '0.0.0.0')
-        dashboard_port = os.getenv('DASHBOARD_PORT', '8501')
+        if self.cfg.quiet:
+            return
         
-        print("\n" + "=" * 80)
-        print("🌐 URLS DE ACCESO")
-        print("=" * 80)
-        print(f"📊 Dashboard React:    http://localhost:3000")
-        print(f"🚀 API FastAPI:        http://{api_host}:{api_port}")
-        print(f"📈 API Docs:           http://{api_host}:{api_port}/docs")
-        print(f"📋 Dashboard Streamlit: http://{dashboard_host}:{dashboard_port}")
-        print("=" * 80)
-        print("💡 Usa Ctrl+C para detener el sistema")
-        print("=" * 80 + "\n")
+        sys.stdout.write(ACCESS_URLS.format(
+            api_host=self.cfg.api_host,
+            api_port=self.cfg.api_port,
+            dashboard_host=self.cfg.dashboard_host,
+            dashboard_port=self.cfg.dashboard_port
+        ))
+        sys.stdout.flush()
         
     async def run(self):
         """Ejecutar el sistema principal."""
+        import signal
+        
         self.is_running = True
+        self._stop = asyncio.Event()
+        
+        # Ctrl+C / SIGTERM despiertan al bucle principal (no disponible en Windows)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
         
         try:
             # Inicializar sistema
@@ -220,37 +447,38 @@ class AITradingSystem:
                 return
             
             # Mostrar modo de trading
-            trading_mode = os.getenv('TRADING_MODE', 'paper')
-            if trading_mode == "paper":
+            if self.cfg.trading_mode == "paper":
                 self.logger.info("📊 Ejecutando en modo Paper Trading")
             else:
                 self.logger.warning("⚠️ Ejecutando en modo LIVE TRADING")
             
             # Iniciar servidores web
-            self.start_api_server()
-            time.sleep(2)  # Esperar a que inicie la API
+            await self.start_api_server()
+            
+            await self.start_frontend_server()
+            await self.start_streamlit_dashboard()
             
-            self.start_frontend_server()
-            self.start_streamlit_dashboard()
+            # Esperar a que Streamlit acepte conexiones antes de mostrar las URLs
+            if self.streamlit_process:
+                if not await self._wait_port(self.cfg.dashboard_host, self.cfg.dashboard_port):
+                    self.logger.warning("⚠️ Streamlit aún no responde, continuando")
             
             # Mostrar URLs
             self.show_access_urls()
             
             # Iniciar agente de trading si está habilitado
-            trading_agent_enabled = os.getenv('TRADING_AGENT_ENABLED', 'false').lower() == 'true'
-            if trading_agent_enabled and self.trading_agent:
+            if self.cfg.agent_enabled and self.trading_agent:
                 self.logger.info("🤖 Iniciando Trading Agent...")
                 # Aquí podrías iniciar el agente en background
                 # asyncio.create_task(self.trading_agent.analyze_and_trade(['AAPL', 'MSFT']))
             
-            # Mantener el sistema ejecutándose
-            while self.is_running:
-                await asyncio.sleep(1)
+            # Mantener el sistema ejecutándose hasta recibir la señal de parada
+            await self._stop.wait()
             
         except KeyboardInterrupt:
             self.logger.info("🛑 Sistema detenido por el usuario")
         except Exception as e:
-            self.logger.error(f"❌ Error crítico: {e}")
+            self.logger.error("❌ Error crítico: %s", e)
             raise
         finally:
             await self.cleanup()
@@ -259,19 +487,25 @@ class AITradingSystem:
         """Limpiar recursos al cerrar."""
         self.logger.info("🧹 Limpiando recursos...")
         self.is_running = False
+        if self._stop:
+            self._stop.set()
         
-        # Detener procesos
-        if self.api_process:
-            self.api_process.terminate()
-            self.api_process.wait()
+        # Detener servidor API y procesos: primero se avisa a todos y luego
+        # se espera en paralelo
+        if self.api_server:
+            self.api_server.should_exit = True
         
-        if self.frontend_process:
-            self.frontend_process.terminate()
-            self.frontend_process.wait()
-            
-        if self.streamlit_process:
-            self.streamlit_process.terminate()
-            self.streamlit_process.wait()
+        procs = [
+            proc for proc in (self.frontend_process, self.streamlit_process)
+            if proc and proc.returncode is None
+        ]
+        for proc in procs:
+            proc.terminate()
+        
+        pending = [proc.wait() for proc in procs]
+        if self.api_task:
+            pending.append(self.api_task)
+        await asyncio.gather(*pending, return_exceptions=True)
         
         # Cerrar conexiones de broker
         if self.alpaca_broker:
@@ -282,36 +516,37 @@ class AITradingSystem:
 
 def main():
     """Función principal."""
-    print("=" * 80)
-    print("🤖 AI TRADING SYSTEM v2.0")
-    print("=" * 80)
-    print("Sistema de trading avanzado con agentes IA")
+    if not _parse_bool(os.getenv('AI_TRADING_QUIET')):
+        sys.stdout.write(BANNER.format(
+            trading_mode=os.getenv('TRADING_MODE', 'paper').upper(),
+            exchange=os.getenv('DEFAULT_EXCHANGE', 'alpaca').upper(),
+            symbol=os.getenv('DEFAULT_SYMBOL', 'AAPL'),
+            environment=os.getenv('ENVIRONMENT', 'development').upper()
+        ))
+        sys.stdout.flush()
     
-    trading_mode = os.getenv('TRADING_MODE', 'paper')
-    exchange = os.getenv('DEFAULT_EXCHANGE', 'alpaca')
-    symbol = os.getenv('DEFAULT_SYMBOL', 'AAPL')
-    environment = os.getenv('ENVIRONMENT', 'development')
-    
-    print(f"Modo: {trading_mode.upper()}")
-    print(f"Exchange: {exchange.upper()}")
-    print(f"Símbolo: {symbol}")
-    print(f"Entorno: {environment.upper()}")
-    print("=" * 80)
-    print("Características:")
-    print("• Análisis técnico automatizado")
-    print("• Agentes IA autónomos con LangChain")
-    print("• Gestión de riesgo inteligente")
-    print("• Dashboard React + FastAPI")
-    print("• Machine Learning (Random Forest, LSTM)")
-    print("• Paper Trading con Alpaca")
-    print("• MongoDB para persistencia")
-    print("=" * 80)
-    print("⚠️  ADVERTENCIA: Siempre usa paper trading primero")
-    print("=" * 80)
+    # Usar uvloop como event loop si está instalado
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     
     # Crear y ejecutar el sistema
     system = AITradingSystem()
     
+    # Solo API: reemplazar este proceso por uvicorn, sin proceso padre ocioso
+    if system.cfg.api_only:
+        logger.info("🌐 Modo solo API, cediendo el proceso a uvicorn...")
+        sys.stdout.flush()
+        os.execvp(sys.executable, [
+            sys.executable, "-m", "uvicorn", "api.main:app",
+            "--app-dir", str(_BASE_DIR),
+            "--host", system.cfg.api_host,
+            "--port", str(system.cfg.api_port),
+            "--log-level", system.cfg.uvicorn_log_level
+        ])
+    
     try:
         asyncio.run(system.run())
     except KeyboardInterrupt:
@@ -0,0 +1,226 @@
+"""
+Cálculo de riesgo compilado con Numba.
+
+Núcleos numéricos que se ejecutan en cada evaluación de riesgo; si Numba
+no está instalado se usan las mismas funciones en Python puro.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Sustituto sin compilación cuando Numba no está disponible."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def quickselect_quantile(values: np.ndarray, q: float) -> float:
+    """
+    Cuantil q de values en O(n) con np.partition.
+
+    Usa la misma interpolación lineal que np.percentile(values, q * 100)
+    sin ordenar el array completo.
+    """
+    n = values.shape[0]
+    pos = q * (n - 1)
+    lo = int(pos)
+    hi = min(lo + 1, n - 1)
+
+    part = np.partition(values, hi)
+    upper = part[hi]
+    if hi == lo:
+        return upper
+    # Los elementos a la izquierda de hi son <= part[hi]; su máximo es el lo-ésimo
+    lower = part[:hi].max()
+    return lower + (upper - lower) * (pos - lo)
+
+
+@njit(cache=True, fastmath=True)
+def position_risk_kernel(
+    close: np.ndarray,
+    position_size: float,
+    entry_price: float,
+    current_price: float,
+    stop_pct: float,
+    tp_pct: float,
+    confidence_level: float
+):
+    """
+    Volatilidad, VaR y niveles de salida de una posición.
+
+    Args:
+        close: Precios de cierre (float64, sin NaN, al menos 2 valores)
+        position_size: Tamaño (positivo = largo, negativo = corto)
+        entry_price: Precio de entrada
+        current_price: Precio actual
+        stop_pct: Stop loss como fracción
+        tp_pct: Take profit como fracción
+        confidence_level: Cola del VaR (0.05 = 95% de confianza)
+
+    Returns:
+        Tupla (volatilidad anualizada, VaR 1d, VaR 5d, stop loss,
+        take profit, ratio riesgo/beneficio, pérdida potencial)
+    """
+    n = close.shape[0] - 1
+    returns = np.empty(n)
+
+    # Retornos y varianza (Welford) en una sola pasada
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        r = close[i + 1] / close[i] - 1.0
+        returns[i] = r
+        delta = r - mean
+        mean += delta / (i + 1)
+        m2 += delta * (r - mean)
+
+    volatility = np.sqrt(m2 / (n - 1)) * np.sqrt(252.0) if n > 1 else np.nan
+
+    quantile = quickselect_quantile(returns, confidence_level)
+
+    market_value = abs(position_size * current_price)
+    var_1d = market_value * abs(quantile)
+    var_5d = var_1d * np.sqrt(5.0)
+
+    if position_size > 0:  # Posición larga
+        stop_loss_price = entry_price * (1.0 - stop_pct)
+        take_profit_price = entry_price * (1.0 + tp_pct)
+    else:  # Posición corta
+        stop_loss_price = entry_price * (1.0 + stop_pct)
+        take_profit_price = entry_price * (1.0 - tp_pct)
+
+    potential_loss = abs(entry_price - stop_loss_price) * abs(position_size)
+    potential_profit = abs(take_profit_price - entry_price) * abs(position_size)
+    risk_reward_ratio = potential_profit / potential_loss if potential_loss > 0.0 else 0.0
+
+    return (volatility, var_1d, var_5d, stop_loss_price, take_profit_price,
+            risk_reward_ratio, potential_loss)
+
+
+@njit(cache=True, fastmath=True)
+def welford_update(close: np.ndarray, start: int, n: int, mean: float, m2: float):
+    """
+    Incorporar los retornos de close[start:] al estado de Welford.
+
+    Args:
+        close: Precios de cierre (float64, sin NaN)
+        start: Primer índice de close aún no procesado (>= 1)
+        n: Retornos acumulados hasta ahora
+        mean: Media de los retornos acumulados
+        m2: Suma de cuadrados de las desviaciones acumuladas
+
+    Returns:
+        Tupla (n, mean, m2) actualizada
+    """
+    for i in range(start, close.shape[0]):
+        r = close[i] / close[i - 1] - 1.0
+        n += 1
+        delta = r - mean
+        mean += delta / n
+        m2 += delta * (r - mean)
+    return n, mean, m2
+
+
+@njit(cache=True, fastmath=True)
+def epsilon_drawdown(values: np.ndarray, eps: float) -> float:
+    """
+    Drawdown actual con filtro ε.
+
+    El pico de referencia es siempre el máximo acumulado de la ventana. El
+    filtro solo afecta al mínimo del episodio: un rebote desde el mínimo
+    que no supera eps (retorno relativo) se considera ruido y se sigue
+    reportando la profundidad del episodio; tras un rebote mayor se mide
+    desde el nuevo nivel. El resultado nunca es menor que el drawdown
+    respecto al máximo acumulado.
+
+    Args:
+        values: Valores del portafolio (más antiguo primero)
+        eps: Rebote mínimo que deja de considerarse ruido
+
+    Returns:
+        Caída relativa del mínimo del episodio actual respecto al pico
+    """
+    peak = values[0]
+    low = values[0]
+    for i in range(1, values.shape[0]):
+        x = values[i]
+        if x >= peak:
+            # Nuevo máximo: no hay drawdown en curso
+            peak = x
+            low = x
+        elif x < low:
+            low = x
+        elif x - low > eps * low:
+            # Rebote significativo: el mínimo del episodio pasa a ser el
+            # nivel actual (el pico no cambia)
+            low = x
+
+    if peak <= 0.0:
+        return 0.0
+    return (peak - low) / peak
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def max_abs_corr(returns: np.ndarray, stop_at: float) -> float:
+    """
+    Máxima correlación absoluta entre pares de columnas de returns.
+
+    Cada fila de la matriz de pares deja de recorrerse en cuanto alcanza
+    stop_at, ya que ningún par puede superar 1.0. Las columnas constantes
+    se ignoran.
+
+    Args:
+        returns: Matriz T x K de retornos alineados (float32/float64, sin NaN)
+        stop_at: Umbral a partir del cual se corta el recorrido
+
+    Returns:
+        Máxima |correlación| encontrada (0.0 si no hay pares válidos)
+    """
+    t, k = returns.shape
+
+    # Columnas centradas y normalizadas, una fila por símbolo (contiguas),
+    # en el mismo tipo que la entrada (float32 o float64)
+    z = np.empty((k, t), dtype=returns.dtype)
+    valid = np.zeros(k, dtype=np.bool_)
+    for j in prange(k):
+        mean = 0.0
+        for i in range(t):
+            mean += returns[i, j]
+        mean /= t
+        ss = 0.0
+        for i in range(t):
+            d = returns[i, j] - mean
+            z[j, i] = d
+            ss += d * d
+        if ss > 0.0:
+            valid[j] = True
+            inv = 1.0 / np.sqrt(ss)
+            for i in range(t):
+                z[j, i] *= inv
+
+    row_max = np.zeros(k)
+    for a in prange(k):
+        if not valid[a]:
+            continue
+        best = 0.0
+        for b in range(a + 1, k):
+            if not valid[b]:
+                continue
+            acc = 0.0
+            for i in range(t):
+                acc += z[a, i] * z[b, i]
+            acc = abs(acc)
+            if acc > best:
+                best = acc
+                if best >= stop_at:
+                    break
+        row_max[a] = best
+    return min(row_max.max(), 1.0) if k else 0.0
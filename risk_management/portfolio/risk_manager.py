@@ -7,13 +7,30 @@ calcula stop-loss dinámicos y protege el capital.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Any
+import weakref
+from bisect import bisect_right
+from typing import Deque, Dict, List, Optional, Tuple, Any
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 
 from utils.logging.logger import trading_logger
 from utils.config.settings import Settings
+from risk_management.portfolio._risk_math import (
+    NUMBA_AVAILABLE, epsilon_drawdown, max_abs_corr,
+    position_risk_kernel, welford_update
+)
+
+# Registros del historial del portafolio que se conservan
+HISTORY_SIZE = 1000
+
+# Correlación a partir de la cual se deja de buscar un máximo mayor
+CORRELATION_STOP = 0.999
+
+# Símbolos a partir de los cuales la correlación se calcula en float32
+# (error ~1e-6, irrelevante frente al umbral de 0.7)
+FLOAT32_CORRELATION_SYMBOLS = 64
 
 
 class RiskLevel(Enum):
@@ -53,6 +70,50 @@ class PositionRisk:
     max_loss_percent: float
 
 
+@dataclass
+class PositionBook:
+    """Posiciones en columnas NumPy (tamaños y precios por símbolo)."""
+    symbols: List[str]
+    sizes: np.ndarray
+    prices: np.ndarray
+    entry_prices: np.ndarray
+    current_prices: np.ndarray
+    
+    @classmethod
+    def from_positions(cls, positions: Dict[str, Dict]) -> 'PositionBook':
+        """Construir el libro a partir del diccionario {symbol: position_data}."""
+        # Una sola pasada por el diccionario; sin precio actual se asume el
+        # de entrada
+        sizes, prices, entry_prices, current_prices = [], [], [], []
+        for pos in positions.values():
+            entry_price = pos.get('entry_price', 0)
+            sizes.append(pos.get('size', 0))
+            prices.append(pos.get('price', 0))
+            entry_prices.append(entry_price)
+            current_prices.append(pos.get('current_price', entry_price))
+        
+        # Una conversión a (4, N) en orden C: cada fila (columna del libro)
+        # queda contigua en memoria
+        columns = np.array(
+            [sizes, prices, entry_prices, current_prices], dtype=np.float64
+        ).reshape(4, len(sizes))
+        return cls(
+            symbols=list(positions.keys()),
+            sizes=columns[0],
+            prices=columns[1],
+            entry_prices=columns[2],
+            current_prices=columns[3]
+        )
+    
+    def exposures(self) -> np.ndarray:
+        """Valor absoluto de cada posición."""
+        return np.abs(self.sizes * self.prices)
+    
+    def exposure(self) -> float:
+        """Exposición total del libro."""
+        return float(self.exposures().sum())
+
+
 class RiskManager:
     """Gestor principal de riesgo."""
     
@@ -68,8 +129,28 @@ class RiskManager:
             'max_drawdown': 0.15  # Drawdown máximo (15%)
         }
         
+        # Umbrales de risk_score y nivel correspondiente a cada tramo
+        self._risk_thresholds = (0.3, 0.6, 0.8)
+        self._risk_levels = (RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL)
+        
         self.position_history: Dict[str, List[Dict]] = {}
-        self.portfolio_history: List[Dict] = []
+        
+        # Cierres (ndarray) y retornos por símbolo, válidos mientras el
+        # DataFrame sea el mismo objeto y no cambie de longitud:
+        # (referencia débil al DataFrame, longitud, cierres, retornos)
+        self._returns_cache: Dict[str, Tuple[weakref.ref, int, np.ndarray, pd.Series]] = {}
+        
+        # Estado incremental de volatilidad por símbolo:
+        # (cierres procesados, primer cierre, último cierre, n, media, M2)
+        self._vol_state: Dict[str, Tuple[int, float, float, int, float, float]] = {}
+        self.portfolio_history: Deque[Dict] = deque(maxlen=HISTORY_SIZE)
+        
+        # Buffer circular de valores escrito por duplicado (posiciones i e
+        # i + HISTORY_SIZE) para que los últimos k valores sean siempre un
+        # slice contiguo, sin copias
+        self._values_buf = np.empty(2 * HISTORY_SIZE)
+        self._values_head = 0
+        self._values_len = 0
         
     def assess_portfolio_risk(
         self,
@@ -90,19 +171,20 @@ class RiskManager:
         """
         try:
             # Calcular riesgos individuales
-            portfolio_risk = self._calculate_portfolio_risk(positions, portfolio_value)
-            position_risk = self._calculate_position_risk(positions, portfolio_value)
+            book = PositionBook.from_positions(positions)
+            portfolio_risk = self._calculate_portfolio_risk(book, portfolio_value)
+            position_risk = self._calculate_position_risk(book, portfolio_value)
+            
             volatility_risk = self._calculate_volatility_risk(market_data)
             correlation_risk = self._calculate_correlation_risk(positions, market_data)
             drawdown_risk = self._calculate_drawdown_risk()
             
             # Calcular riesgo general
-            risk_components = [
-                portfolio_risk, position_risk, volatility_risk,
-                correlation_risk, drawdown_risk
-            ]
-            
-            risk_score = np.mean(risk_components)
+            # Media de los cinco componentes
+            risk_score = (
+                portfolio_risk + position_risk + volatility_risk +
+                correlation_risk + drawdown_risk
+            ) * 0.2
             overall_risk = self._determine_risk_level(risk_score)
             
             # Generar recomendaciones
@@ -166,27 +248,22 @@ class RiskManager:
             market_value = abs(position_size * current_price)
             portfolio_weight = market_value / portfolio_value
             
-            # Calcular volatilidad
-            returns = market_data['close'].pct_change().dropna()
-            volatility = returns.std() * np.sqrt(252)  # Volatilidad anualizada
+            close, _ = self._symbol_series(symbol, market_data)
+            if len(close) < 2:
+                raise ValueError("historial de precios insuficiente")
             
-            # Value at Risk (VaR)
+            # Volatilidad, VaR al 95%, stop loss / take profit y ratio
+            # riesgo/beneficio en un solo núcleo compilado
             confidence_level = 0.05  # 95% de confianza
-            var_1d = market_value * abs(np.percentile(returns, confidence_level * 100))
-            var_5d = var_1d * np.sqrt(5)  # VaR para 5 días
-            
-            # Stop loss y take profit
-            if position_size > 0:  # Posición larga
-                stop_loss_price = entry_price * (1 - self.risk_limits['stop_loss_percent'])
-                take_profit_price = entry_price * (1 + self.risk_limits['take_profit_percent'])
-            else:  # Posición corta
-                stop_loss_price = entry_price * (1 + self.risk_limits['stop_loss_percent'])
-                take_profit_price = entry_price * (1 - self.risk_limits['take_profit_percent'])
-            
-            # Ratio riesgo/beneficio
-            potential_loss = abs(entry_price - stop_loss_price) * abs(position_size)
-            potential_profit = abs(take_profit_price - entry_price) * abs(position_size)
-            risk_reward_ratio = potential_profit / potential_loss if potential_loss > 0 else 0
+            (
+                volatility, var_1d, var_5d, stop_loss_price, take_profit_price,
+                risk_reward_ratio, potential_loss
+            ) = position_risk_kernel(
+                close, float(position_size), float(entry_price), float(current_price),
+                self.risk_limits['stop_loss_percent'],
+                self.risk_limits['take_profit_percent'],
+                confidence_level
+            )
             
             # Pérdida máxima
             max_loss_amount = potential_loss
@@ -240,17 +317,14 @@ class RiskManager:
                 return False, f"Posición muy grande: {position_weight:.2%} > {self.risk_limits['max_position_size']:.2%}"
             
             # Verificar exposición total
-            total_exposure = sum(
-                abs(pos.get('size', 0) * pos.get('price', 0)) 
-                for pos in current_positions.values()
-            )
-            total_exposure += position_value
+            book = PositionBook.from_positions(current_positions)
+            total_exposure = book.exposure() + position_value
             
             if total_exposure / portfolio_value > 0.95:  # 95% máximo
                 return False, f"Exposición total muy alta: {total_exposure/portfolio_value:.2%}"
             
             # Verificar límites de pérdida diaria
-            daily_loss = self._calculate_daily_loss(current_positions)
+            daily_loss = self._calculate_daily_loss(book)
             if daily_loss > self.risk_limits['max_daily_loss']:
                 return False, f"Límite de pérdida diaria alcanzado: {daily_loss:.2%}"
             
@@ -313,63 +387,110 @@ class RiskManager:
     
     def _calculate_portfolio_risk(
         self, 
-        positions: Dict[str, Dict], 
+        book: PositionBook, 
         portfolio_value: float
     ) -> float:
         """Calcular riesgo del portafolio."""
-        if not positions:
+        if not book.symbols:
             return 0.0
         
-        # Concentración de posiciones
-        position_weights = []
-        for pos in positions.values():
-            weight = abs(pos.get('size', 0) * pos.get('price', 0)) / portfolio_value
-            position_weights.append(weight)
-        
-        # Índice de Herfindahl (concentración)
-        hhi = sum(w**2 for w in position_weights)
+        # Índice de Herfindahl (concentración) como producto escalar de pesos
+        weights = book.exposures() / portfolio_value
+        hhi = float(weights @ weights)
         concentration_risk = min(hhi * 2, 1.0)  # Normalizar
         
         return concentration_risk
     
     def _calculate_position_risk(
         self, 
-        positions: Dict[str, Dict], 
+        book: PositionBook, 
         portfolio_value: float
     ) -> float:
         """Calcular riesgo de posiciones individuales."""
-        if not positions:
+        if not book.symbols:
             return 0.0
         
-        max_position_risk = 0.0
-        
-        for symbol, pos in positions.items():
-            position_value = abs(pos.get('size', 0) * pos.get('price', 0))
-            position_weight = position_value / portfolio_value
-            
-            # Riesgo basado en tamaño de posición
-            size_risk = position_weight / self.risk_limits['max_position_size']
-            max_position_risk = max(max_position_risk, size_risk)
+        # Riesgo basado en el tamaño de la mayor posición
+        max_weight = float(book.exposures().max()) / portfolio_value
+        max_position_risk = max_weight / self.risk_limits['max_position_size']
         
         return min(max_position_risk, 1.0)
     
-    def _calculate_volatility_risk(self, market_data: Dict[str, pd.DataFrame]) -> float:
-        """Calcular riesgo de volatilidad."""
-        if not market_data:
-            return 0.0
+    def _symbol_series(self, symbol: str, df: pd.DataFrame) -> Tuple[np.ndarray, pd.Series]:
+        """
+        Cierres como float64 y retornos diarios de un símbolo, memoizados.
         
-        volatilities = []
+        Se reutilizan entre los cálculos de una misma evaluación y entre
+        evaluaciones mientras el DataFrame no cambie.
+        """
+        cached = self._returns_cache.get(symbol)
+        if cached is not None and cached[0]() is df and cached[1] == len(df):
+            return cached[2], cached[3]
+        
+        close = df['close'].dropna()
+        returns = close.pct_change().dropna()
+        close_arr = close.to_numpy(dtype=np.float64)
+        self._returns_cache[symbol] = (weakref.ref(df), len(df), close_arr, returns)
+        return close_arr, returns
+    
+    def _symbol_volatility(self, symbol: str, df: pd.DataFrame) -> float:
+        """
+        Volatilidad anualizada de un símbolo con estado incremental.
         
-        for symbol, df in market_data.items():
-            if len(df) > 20:
-                returns = df['close'].pct_change().dropna()
-                volatility = returns.std() * np.sqrt(252)  # Anualizada
-                volatilities.append(volatility)
+        Si el DataFrame solo ha crecido por el final desde la última
+        llamada, se procesan únicamente los cierres nuevos; en otro caso
+        se recalcula desde cero.
+        """
+        close, _ = self._symbol_series(symbol, df)
+        length = len(close)
+        
+        state = self._vol_state.get(symbol)
+        if (
+            state is not None
+            and 0 < state[0] <= length
+            and close[0] == state[1]
+            and close[state[0] - 1] == state[2]
+        ):
+            processed, _, _, n, mean, m2 = state
+            if processed < length:
+                n, mean, m2 = welford_update(close, processed, n, mean, m2)
+        elif length > 1:
+            # Recalcular desde cero: una sola reducción vectorizada
+            returns = close[1:] / close[:-1] - 1.0
+            n = len(returns)
+            mean = float(returns.mean())
+            m2 = float(np.square(returns - mean).sum())
+        else:
+            n, mean, m2 = 0, 0.0, 0.0
         
-        if not volatilities:
+        if length:
+            self._vol_state[symbol] = (length, close[0], close[-1], n, mean, m2)
+        
+        if n < 2:
+            return np.nan
+        return np.sqrt(m2 / (n - 1)) * np.sqrt(252)  # Anualizada
+    
+    def _calculate_volatility_risk(self, market_data: Dict[str, pd.DataFrame]) -> float:
+        """Calcular riesgo de volatilidad."""
+        # Descartar estado de símbolos que ya no se siguen
+        for symbol in self._vol_state.keys() - market_data.keys():
+            del self._vol_state[symbol]
+        for symbol in self._returns_cache.keys() - market_data.keys():
+            del self._returns_cache[symbol]
+        
+        volatilities = np.fromiter(
+            (
+                self._symbol_volatility(symbol, df)
+                for symbol, df in market_data.items()
+                if len(df) > 20
+            ),
+            dtype=np.float64
+        )
+        
+        if not volatilities.size:
             return 0.0
         
-        avg_volatility = np.mean(volatilities)
+        avg_volatility = volatilities.mean()
         # Normalizar: volatilidad > 50% = riesgo alto
         return min(avg_volatility / 0.5, 1.0)
     
@@ -382,77 +503,73 @@ class RiskManager:
         if len(positions) < 2:
             return 0.0
         
-        symbols = list(positions.keys())
-        correlations = []
-        
-        for i, symbol1 in enumerate(symbols):
-            for symbol2 in symbols[i+1:]:
-                if symbol1 in market_data and symbol2 in market_data:
-                    df1 = market_data[symbol1]
-                    df2 = market_data[symbol2]
-                    
-                    if len(df1) > 20 and len(df2) > 20:
-                        returns1 = df1['close'].pct_change().dropna()
-                        returns2 = df2['close'].pct_change().dropna()
-                        
-                        # Alinear fechas
-                        common_dates = returns1.index.intersection(returns2.index)
-                        if len(common_dates) > 10:
-                            corr = returns1[common_dates].corr(returns2[common_dates])
-                            if not np.isnan(corr):
-                                correlations.append(abs(corr))
-        
-        if not correlations:
+        # Retornos de los símbolos en cartera con historial suficiente
+        held = {
+            symbol: self._symbol_series(symbol, market_data[symbol])[1]
+            for symbol in positions
+            if symbol in market_data and len(market_data[symbol]) > 20
+        }
+        if len(held) < 2:
+            return 0.0
+        
+        # Matriz de retornos alineada por fecha (T x N)
+        # (join interno: cada serie ya viene sin NaN, no hace falta dropna)
+        returns = pd.concat(held, axis=1, join='inner')
+        if len(returns) <= 10:
             return 0.0
         
-        max_correlation = max(correlations)
-        return max_correlation  # Ya está entre 0 y 1
+        # Con Numba solo se busca el máximo (cortando al llegar a
+        # CORRELATION_STOP); si no, matriz completa con np.corrcoef
+        # En universos grandes float32 reduce a la mitad el tráfico de memoria
+        dtype = np.float32 if len(held) >= FLOAT32_CORRELATION_SYMBOLS else np.float64
+        matrix = returns.to_numpy(dtype=dtype)
+        if NUMBA_AVAILABLE:
+            return float(max_abs_corr(matrix, CORRELATION_STOP))
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.corrcoef(matrix, rowvar=False, dtype=dtype)
+        
+        # Solo el triángulo superior (cada par una vez)
+        pairs = np.abs(corr[np.triu_indices(len(held), k=1)])
+        pairs = pairs[~np.isnan(pairs)]
+        if pairs.size == 0:
+            return 0.0
+        
+        return float(pairs.max())  # Ya está entre 0 y 1
     
     def _calculate_drawdown_risk(self) -> float:
         """Calcular riesgo de drawdown."""
-        if len(self.portfolio_history) < 10:
+        if self._values_len < 10:
             return 0.0
         
-        # Calcular drawdown actual
-        values = [entry['value'] for entry in self.portfolio_history[-100:]]  # Últimos 100 valores
-        peak = max(values)
-        current = values[-1]
+        # Drawdown actual sobre los últimos 100 valores, medido desde su
+        # máximo; los rebotes menores que una desviación típica de los
+        # retornos se tratan como ruido y no reducen la profundidad
+        values = self._recent_values(100)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eps = float(np.std(values[1:] / values[:-1] - 1.0))
+        if not np.isfinite(eps):
+            eps = 0.0
         
-        current_drawdown = (peak - current) / peak if peak > 0 else 0
+        current_drawdown = epsilon_drawdown(values, eps)
         
         # Normalizar con límite máximo
         return min(current_drawdown / self.risk_limits['max_drawdown'], 1.0)
     
-    def _calculate_daily_loss(self, positions: Dict[str, Dict]) -> float:
+    def _calculate_daily_loss(self, book: PositionBook) -> float:
         """Calcular pérdida diaria actual."""
         # Simplificado - en implementación real, usar datos históricos
-        total_loss = 0.0
-        
-        for pos in positions.values():
-            entry_price = pos.get('entry_price', 0)
-            current_price = pos.get('current_price', entry_price)
-            size = pos.get('size', 0)
-            
-            if size > 0:  # Posición larga
-                loss = max(0, (entry_price - current_price) * size)
-            else:  # Posición corta
-                loss = max(0, (current_price - entry_price) * abs(size))
-            
-            total_loss += loss
+        # El signo del tamaño cubre largos y cortos: pérdida = max(0, -PnL)
+        pnl = (book.current_prices - book.entry_prices) * book.sizes
+        total_loss = float(np.maximum(0.0, -pnl).sum())
         
         # Retornar como porcentaje del capital inicial
         return total_loss / self.settings.BACKTEST_INITIAL_CAPITAL
     
     def _determine_risk_level(self, risk_score: float) -> RiskLevel:
         """Determinar nivel de riesgo basado en score."""
-        if risk_score < 0.3:
-            return RiskLevel.LOW
-        elif risk_score < 0.6:
-            return RiskLevel.MEDIUM
-        elif risk_score < 0.8:
-            return RiskLevel.HIGH
-        else:
-            return RiskLevel.CRITICAL
+        # bisect_right: un score igual al umbral pasa al tramo superior
+        return self._risk_levels[bisect_right(self._risk_thresholds, risk_score)]
     
     def _generate_risk_recommendations(
         self,
@@ -525,6 +642,15 @@ class RiskManager:
             'value': portfolio_value
         })
         
-        # Mantener solo últimos 1000 registros
-        if len(self.portfolio_history) > 1000:
-            self.portfolio_history = self.portfolio_history[-1000:]
\ No newline at end of file
+        # deque descarta el registro más antiguo al superar HISTORY_SIZE
+        head = self._values_head
+        self._values_buf[head] = portfolio_value
+        self._values_buf[head + HISTORY_SIZE] = portfolio_value
+        self._values_head = (head + 1) % HISTORY_SIZE
+        self._values_len = min(self._values_len + 1, HISTORY_SIZE)
+    
+    def _recent_values(self, k: int) -> np.ndarray:
+        """Vista de los últimos k valores del portafolio (más antiguo primero)."""
+        k = min(k, self._values_len)
+        end = self._values_head + HISTORY_SIZE
+        return self._values_buf[end - k:end]
@@ -36,6 +36,10 @@ class Settings(BaseSettings):
     STOP_LOSS_PERCENT: float = Field(default=0.02, description="Stop loss (2%)")
     TAKE_PROFIT_PERCENT: float = Field(default=0.04, description="Take profit (4%)")
     
+    # Gestión de órdenes
+    ORDER_ARCHIVE_SIZE: int = Field(default=10000, description="Órdenes finalizadas retenidas en memoria")
+    PAPER_LATENCY: float = Field(default=0.0, description="Latencia simulada en paper trading (segundos, 0 = sin espera)")
+    
     # =============================================================================
     # APIS DE EXCHANGES
     # =============================================================================
@@ -27,16 +27,21 @@ class MongoDBClient:
         self.database_name = os.getenv('MONGODB_DATABASE', 'trading_db')
         self.username = os.getenv('MONGODB_USERNAME')
         self.password = os.getenv('MONGODB_PASSWORD')
+        
+        # Single pool shared by every component through get_mongodb_client()
+        self.max_pool_size = int(os.getenv('MONGODB_MAX_POOL_SIZE', '50'))
+        self.min_pool_size = int(os.getenv('MONGODB_MIN_POOL_SIZE', '5'))
     
     async def connect(self) -> bool:
         """Establish connection to MongoDB"""
         try:
             # Create client with authentication if credentials provided
+            pool_options = {'maxPoolSize': self.max_pool_size, 'minPoolSize': self.min_pool_size}
             if self.username and self.password:
                 auth_url = f"mongodb://{self.username}:{self.password}@{self.mongodb_url.split('://', 1)[1]}"
-                self.client = AsyncIOMotorClient(auth_url)
+                self.client = AsyncIOMotorClient(auth_url, **pool_options)
             else:
-                self.client = AsyncIOMotorClient(self.mongodb_url)
+                self.client = AsyncIOMotorClient(self.mongodb_url, **pool_options)
             
             # Get database
             self.database = self.client[self.database_name]
@@ -72,7 +77,20 @@ class MongoDBClient:
         trade_data['timestamp'] = datetime.utcnow()
         result = await collection.insert_one(trade_data)
         return str(result.inserted_id)
-    
+
+    async def save_trades_bulk(self, trades: List[Dict[str, Any]]) -> int:
+        """Save a batch of trades in a single round-trip"""
+        if not trades:
+            return 0
+
+        collection = self.get_collection('trades')
+        now = datetime.utcnow()
+        for trade_data in trades:
+            trade_data['timestamp'] = now
+
+        result = await collection.insert_many(trades, ordered=False)
+        return len(result.inserted_ids)
+
     async def get_trades(self, 
                         symbol: Optional[str] = None,
                         start_date: Optional[datetime] = None,
@@ -124,6 +142,19 @@ class MongoDBClient:
         cursor = collection.find(query)
         return await cursor.to_list(length=None)
     
+    async def get_latest_closes(self, symbols: List[str]) -> Dict[str, float]:
+        """Get the latest stored close for each symbol in one aggregation"""
+        collection = self.get_collection('market_data')
+        
+        pipeline = [
+            {'$match': {'symbol': {'$in': symbols}, 'close': {'$ne': None}}},
+            {'$sort': {'symbol': 1, 'timestamp': -1}},
+            {'$group': {'_id': '$symbol', 'close': {'$first': '$close'}}}
+        ]
+        
+        results = await collection.aggregate(pipeline).to_list(length=None)
+        return {doc['_id']: float(doc['close']) for doc in results}
+    
     async def save_market_data(self, market_data: List[Dict[str, Any]]) -> int:
         """Save market data batch"""
         collection = self.get_collection('market_data')
@@ -285,9 +316,13 @@ class MongoDBClient:
 
 # Global instance
 mongodb_client = MongoDBClient()
+_client_lock = asyncio.Lock()
 
 async def get_mongodb_client() -> MongoDBClient:
     """Get MongoDB client instance"""
     if not mongodb_client.connected:
-        await mongodb_client.connect()
+        # Concurrent first callers share a single connect
+        async with _client_lock:
+            if not mongodb_client.connected:
+                await mongodb_client.connect()
     return mongodb_client
\ No newline at end of file